@@ -1,16 +1,40 @@
 """Session merging and aggregation, adapted from feature_extract.py."""
 
+import concurrent.futures
 import datetime
-from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from . import log_parser
+
+logger = logging.getLogger(__name__)
+
 ACTIVITY_TYPES = {
     'deep_work': {'label_include': 2, 'label_gap': 2},
     'light_work': {'label_include': 1, 'label_gap': 1},
     'wasted': {'label_include': -1, 'label_gap': -1},
 }
 
+SESSION_COLUMNS = [
+    'Date', 'Weekday', 'Activity', 'StartTime', 'DurationHours', 'Activity_Type'
+]
+
+ROLLUP_COLUMNS = [
+    'Date', 'Activity_Type', 'DurationHours', 'Weekday', 'SessionCount', 'MaxHours'
+]
+
+# Days per task when process_range runs on a process pool
+DEFAULT_CHUNK_DAYS = 30
+
 
 def filter_wanted_activity(
     labels: List[int], label_include: int, label_gap: int
@@ -20,21 +44,30 @@ def filter_wanted_activity(
     Adapted from feature_extract.py:199-237. Gap-filling: if a gap-type
     activity sits between two include-type activities, it's included.
     """
-    mask = [False] * len(labels)
+    return wanted_mask(np.asarray(labels), label_include, label_gap).tolist()
 
-    for i in range(len(labels)):
-        if labels[i] != label_include:
-            continue
-        mask[i] = True
-        # Fill gap: if prev is gap-type and the one before is include-type
-        if (i >= 2
-                and labels[i - 1] == label_gap
-                and labels[i - 2] == label_include):
-            mask[i - 1] = True
 
+def wanted_mask(
+    labels: np.ndarray, label_include: int, label_gap: int
+) -> np.ndarray:
+    """Array version of filter_wanted_activity."""
+    include = labels == label_include
+    mask = include.copy()
+    if len(labels) >= 3:
+        # Fill gap: if prev is gap-type and the one before is include-type
+        mask[1:-1] |= include[:-2] & (labels[1:-1] == label_gap) & include[2:]
     return mask
 
 
+def row_timestamps(df: pd.DataFrame) -> np.ndarray:
+    """Per-row datetime64 array, from the parsed Timestamp column when available."""
+    if 'Timestamp' in df.columns:
+        return df['Timestamp'].to_numpy(dtype='datetime64[ns]')
+    return pd.to_datetime(
+        df['Date'].astype(str) + ' ' + df['Time'].astype(str),
+        format="%Y-%m-%d %H:%M:%S").to_numpy(dtype='datetime64[ns]')
+
+
 def extract_sessions(
     df: pd.DataFrame,
     file_date: datetime.date,
@@ -43,98 +76,767 @@ def extract_sessions(
 ) -> pd.DataFrame:
     """Merge consecutive same-label rows into sessions with durations.
 
-    Adapted from feature_extract.py:131-196.
-    """
-    labels = df['Label'].tolist()
-    mask = filter_wanted_activity(labels, label_include, label_gap)
-
-    sessions = []
-    cur_start = None
-    cur_activity = ""
-
-    for idx, row in df.iterrows():
-        date_time_str = f'{row["Date"]} {row["Time"]}'
-        cur_time = datetime.datetime.strptime(date_time_str, "%Y-%m-%d %H:%M:%S")
-
-        if not mask[idx]:
-            # End current session if one is active
-            if cur_activity:
-                duration = (cur_time - cur_start) / datetime.timedelta(hours=1)
-                sessions.append({
-                    'Date': file_date,
-                    'Weekday': file_date.weekday() + 1,
-                    'Activity': cur_activity,
-                    'StartTime': cur_start,
-                    'DurationHours': duration,
-                })
-                cur_activity = ""
-            continue
+    Adapted from feature_extract.py:131-196. Sessions are runs of the wanted
+    mask; each ends at the first row after the run. A run reaching the end of
+    the log ends at the last row and is dropped if it has no length.
+    """
+    mask = wanted_mask(df['Label'].to_numpy(), label_include, label_gap)
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
 
-        # Continuation of current session
-        if idx > 0 and mask[idx - 1]:
-            cur_activity += f'|{row["Activity"]}'
-            continue
+    table = SessionTable([''])
+    _add_day_sessions(table, df, file_date, starts, ends,
+                      np.zeros(len(starts), dtype=np.int8))
+    return table.to_frame()[SESSION_COLUMNS[:-1]]
 
-        # Start of new session
-        cur_start = cur_time
-        cur_activity = row["Activity"]
-
-    # Handle session that extends to end of log (use last row time + small delta)
-    if cur_activity and cur_start:
-        last_time_str = f'{df.iloc[-1]["Date"]} {df.iloc[-1]["Time"]}'
-        last_time = datetime.datetime.strptime(last_time_str, "%Y-%m-%d %H:%M:%S")
-        duration = (last_time - cur_start) / datetime.timedelta(hours=1)
-        if duration > 0:
-            sessions.append({
-                'Date': file_date,
-                'Weekday': file_date.weekday() + 1,
-                'Activity': cur_activity,
-                'StartTime': cur_start,
-                'DurationHours': duration,
-            })
-
-    return pd.DataFrame(sessions, columns=[
-        'Date', 'Weekday', 'Activity', 'StartTime', 'DurationHours'
-    ])
-
-
-def process_day(df: pd.DataFrame, file_date: datetime.date) -> pd.DataFrame:
-    """Run extraction passes for all activity types and concatenate."""
-    dfs = []
-    for act_type, params in ACTIVITY_TYPES.items():
-        sessions = extract_sessions(df, file_date, **params)
-        if not sessions.empty:
-            sessions['Activity_Type'] = act_type
-            dfs.append(sessions)
 
-    if not dfs:
-        return pd.DataFrame(columns=[
-            'Date', 'Weekday', 'Activity', 'StartTime',
-            'DurationHours', 'Activity_Type'
-        ])
-    return pd.concat(dfs, ignore_index=True)
+def segment_runs(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split a label array into maximal equal-label runs.
+
+    Returns (run_labels, run_starts, run_ends) with exclusive row ends.
+    """
+    if len(labels) == 0:
+        empty = np.array([], dtype=np.int64)
+        return labels[:0], empty, empty
+    run_starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+    run_ends = np.append(run_starts[1:], len(labels))
+    return labels[run_starts], run_starts, run_ends
+
+
+def _runs_by_label(run_labels: np.ndarray) -> Dict[int, np.ndarray]:
+    """Map label -> sorted indices of its runs, grouped in one sort."""
+    order = np.argsort(run_labels, kind='stable')
+    uniq, first = np.unique(run_labels[order], return_index=True)
+    return dict(zip(uniq.tolist(), np.split(order, first[1:])))
+
+
+def _type_bounds(
+    runs: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    runs_by_label: Dict[int, np.ndarray],
+    label_include: int,
+    label_gap: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Session (start, end) row indices for one activity type.
+
+    Include-type runs are merged across a single gap-type row, which is what
+    filter_wanted_activity's gap filling amounts to on run boundaries.
+    """
+    run_labels, run_starts, run_ends = runs
+    idx = runs_by_label.get(label_include)
+    if idx is None:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty
+    if label_gap == label_include or len(idx) < 2:
+        return run_starts[idx], run_ends[idx]
+
+    prev, gap = idx[:-1], idx[:-1] + 1
+    merge = ((idx[1:] == prev + 2)
+             & (run_labels[gap] == label_gap)
+             & (run_ends[gap] - run_starts[gap] == 1))
+    first = np.concatenate(([True], ~merge))
+    last = np.concatenate((~merge, [True]))
+    return run_starts[idx[first]], run_ends[idx[last]]
+
+
+class ActivityTextStore:
+    """Interned activity texts: each distinct text is stored once under an id."""
+
+    def __init__(self):
+        self.texts = []
+        self._ids = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def intern(self, text: str) -> int:
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = len(self.texts)
+            self._ids[text] = text_id
+            self.texts.append(text)
+        return text_id
+
+    def intern_many(self, texts: Iterable[str]) -> np.ndarray:
+        """int32 ids for a sequence of texts, interning each distinct one once."""
+        codes, uniques = pd.factorize(pd.Series(list(texts), dtype=object))
+        unique_ids = np.array([self.intern(t) for t in uniques], dtype=np.int32)
+        return unique_ids[codes]
+
+    def join(self, ids: np.ndarray, sep: str = '|',
+             max_chars: Optional[int] = None) -> str:
+        """Concatenate the texts of ids, stopping once max_chars is reached."""
+        if max_chars is None:
+            return sep.join([self.texts[i] for i in ids])
+        parts, length = [], 0
+        for i in ids:
+            parts.append(self.texts[i])
+            length += len(self.texts[i]) + len(sep)
+            if length > max_chars:
+                break
+        return sep.join(parts)[:max_chars]
+
+
+class SessionTable:
+    """Sessions stored as parallel typed arrays (struct of arrays).
+
+    Columns: start (int64 ns since epoch), duration (float32 hours), type
+    (int8 index into act_types), date (int32 ordinal) and the session's
+    [text_lo, text_hi) range in row_text, the int32 text ids of the log rows
+    making up the session. Texts live once in an ActivityTextStore, and a
+    session's '|'-joined activity is only built when asked for. Arrays grow
+    geometrically, so appending days is amortised O(1) per session.
+    """
+
+    _COLUMNS = ('start', 'duration', 'type', 'date', 'text_lo', 'text_hi')
+
+    def __init__(self, act_types: Optional[List[str]] = None, capacity: int = 0):
+        self.act_types = list(act_types or ACTIVITY_TYPES)
+        self.texts = ActivityTextStore()
+        self._n = 0
+        self._n_rows = 0
+        self.start = np.empty(capacity, dtype=np.int64)
+        self.duration = np.empty(capacity, dtype=np.float32)
+        self.type = np.empty(capacity, dtype=np.int8)
+        self.date = np.empty(capacity, dtype=np.int32)
+        self.text_lo = np.empty(capacity, dtype=np.int32)
+        self.text_hi = np.empty(capacity, dtype=np.int32)
+        self.row_text = np.empty(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays and the text store."""
+        arrays = sum(getattr(self, name).nbytes for name in self._COLUMNS)
+        texts = sum(len(t) for t in self.texts.texts)
+        return arrays + self.row_text.nbytes + texts
+
+    def append_day(
+        self,
+        file_date: datetime.date,
+        types: np.ndarray,
+        starts: np.ndarray,
+        hours: np.ndarray,
+        row_ids: np.ndarray,
+        lengths: np.ndarray,
+    ):
+        """Append one day's sessions.
+
+        types are type codes, starts datetime64 values and hours durations;
+        row_ids holds every session's row text ids back to back, lengths the
+        number of rows per session.
+        """
+        k = len(types)
+        self._reserve(self._n + k, self._n_rows + len(row_ids))
+        rows = slice(self._n, self._n + k)
+        self.start[rows] = starts.astype('datetime64[ns]').view(np.int64)
+        self.duration[rows] = hours
+        self.type[rows] = types
+        self.date[rows] = file_date.toordinal()
+        offsets = self._n_rows + np.cumsum(lengths)
+        self.text_lo[rows] = offsets - lengths
+        self.text_hi[rows] = offsets
+        self.row_text[self._n_rows:self._n_rows + len(row_ids)] = row_ids
+        self._n += k
+        self._n_rows += len(row_ids)
+
+    def extend(self, other: 'SessionTable'):
+        """Append all sessions of another table."""
+        k, k_rows = len(other), other._n_rows
+        self._reserve(self._n + k, self._n_rows + k_rows)
+        rows = slice(self._n, self._n + k)
+        codes = np.array([self.type_code(t) for t in other.act_types], dtype=np.int8)
+        text_ids = self.texts.intern_many(other.texts.texts)
+        self.start[rows] = other.start[:k]
+        self.duration[rows] = other.duration[:k]
+        self.type[rows] = codes[other.type[:k]] if k else other.type[:k]
+        self.date[rows] = other.date[:k]
+        self.text_lo[rows] = other.text_lo[:k] + self._n_rows
+        self.text_hi[rows] = other.text_hi[:k] + self._n_rows
+        self.row_text[self._n_rows:self._n_rows + k_rows] = (
+            text_ids[other.row_text[:k_rows]] if k_rows else other.row_text[:k_rows])
+        self._n += k
+        self._n_rows += k_rows
+
+    def activity(self, i: int, max_chars: Optional[int] = None) -> str:
+        """The '|'-joined activity text of session i."""
+        ids = self.row_text[self.text_lo[i]:self.text_hi[i]]
+        return self.texts.join(ids, max_chars=max_chars)
+
+    def to_frame(self, with_activity: bool = True,
+                 max_activity_chars: Optional[int] = None) -> pd.DataFrame:
+        """Session DataFrame with SESSION_COLUMNS.
+
+        StartTime and DurationHours wrap the stored arrays without copying;
+        Date and Activity_Type are materialised as objects. Activity texts are
+        only joined if with_activity is set (optionally truncated), otherwise
+        the column is left empty.
+        """
+        n = self._n
+        ordinals = self.date[:n]
+        unique_ordinals, inverse = np.unique(ordinals, return_inverse=True)
+        dates = np.array([datetime.date.fromordinal(int(o)) for o in unique_ordinals],
+                         dtype=object)
+        if with_activity:
+            activities = [self.activity(i, max_activity_chars) for i in range(n)]
+        else:
+            activities = None
+        return pd.DataFrame({
+            'Date': dates[inverse],
+            # date.fromordinal(1) is a Monday
+            'Weekday': (ordinals.astype(np.int64) - 1) % 7 + 1,
+            'Activity': activities,
+            'StartTime': self.start[:n].view('datetime64[ns]'),
+            'DurationHours': self.duration[:n],
+            'Activity_Type': np.array(self.act_types, dtype=object)[self.type[:n]],
+        }, columns=SESSION_COLUMNS, copy=False)
+
+    def type_code(self, act_type: str) -> int:
+        if act_type not in self.act_types:
+            self.act_types.append(act_type)
+        return self.act_types.index(act_type)
+
+    def _reserve(self, n: int, n_rows: int):
+        if n > len(self.start):
+            capacity = max(n, 2 * len(self.start), 64)
+            for name in self._COLUMNS:
+                old = getattr(self, name)
+                grown = np.empty(capacity, dtype=old.dtype)
+                grown[:self._n] = old[:self._n]
+                setattr(self, name, grown)
+        if n_rows > len(self.row_text):
+            grown = np.empty(max(n_rows, 2 * len(self.row_text), 256), dtype=np.int32)
+            grown[:self._n_rows] = self.row_text[:self._n_rows]
+            self.row_text = grown
+
+
+def _add_day_sessions(
+    table: SessionTable,
+    df: pd.DataFrame,
+    file_date: datetime.date,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    types: np.ndarray,
+):
+    """Append sessions given by (start, end) row bounds of a day's log."""
+    n = len(df)
+    if len(starts) == 0:
+        return
+
+    times = row_timestamps(df)
+    hours = (times[np.minimum(ends, n - 1)] - times[starts]) / np.timedelta64(1, 'h')
+    keep = (ends < n) | (hours > 0)
+    starts, ends, hours = starts[keep], ends[keep], hours[keep]
+
+    # Row indices of every session, back to back
+    lengths = ends - starts
+    session_rows = (np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                    + np.arange(lengths.sum()))
+    # Only rows inside a session have their text interned
+    text_ids = table.texts.intern_many(df['Activity'].iloc[session_rows].astype(str))
+    table.append_day(file_date, types[keep], times[starts], hours, text_ids, lengths)
+
+
+class _StreamState:
+    """Session state for one activity type while streaming rows.
+
+    Mirrors filter_wanted_activity + extract_sessions: a single gap-type row
+    between two include-type rows is held as pending and folded into the
+    session if the next row is include-type again.
+    """
+
+    def __init__(self, label_include: int, label_gap: int):
+        self.label_include = label_include
+        self.label_gap = label_gap
+        self.start = None
+        self.texts = []
+        self.pending_gap = None
+
+    def feed(self, timestamp: datetime.datetime, label: int, text: str
+             ) -> Optional[Tuple[datetime.datetime, float, str]]:
+        """Consume one row; returns (start, hours, activity) if a session closed."""
+        if label == self.label_include:
+            if self.start is None:
+                self.start = timestamp
+                self.texts = [text]
+            else:
+                if self.pending_gap is not None:
+                    self.texts.append(self.pending_gap[1])
+                    self.pending_gap = None
+                self.texts.append(text)
+            return None
+
+        if (self.start is not None and self.pending_gap is None
+                and label == self.label_gap):
+            self.pending_gap = (timestamp, text)
+            return None
+
+        if self.start is None:
+            return None
+        end = self.pending_gap[0] if self.pending_gap is not None else timestamp
+        session = self._session(end)
+        self.start = None
+        self.texts = []
+        self.pending_gap = None
+        return session
+
+    def current(self, last_timestamp: datetime.datetime
+                ) -> Optional[Tuple[datetime.datetime, float, str]]:
+        """The open session as it would be closed at the end of the log.
+
+        A pending gap row ends it; otherwise it runs to the last row and is
+        dropped if it has no length. The state itself is left untouched.
+        """
+        end = self._open_end(last_timestamp)
+        return self._session(end) if end is not None else None
+
+    def current_hours(self, last_timestamp: datetime.datetime) -> float:
+        """Hours of the open session (see current()), without joining its texts."""
+        end = self._open_end(last_timestamp)
+        return (end - self.start) / datetime.timedelta(hours=1) if end is not None else 0.0
+
+    def _open_end(self, last_timestamp: datetime.datetime
+                  ) -> Optional[datetime.datetime]:
+        if self.start is None:
+            return None
+        if self.pending_gap is not None:
+            return self.pending_gap[0]
+        return last_timestamp if last_timestamp > self.start else None
+
+    def _session(self, end: datetime.datetime) -> Tuple[datetime.datetime, float, str]:
+        return (self.start,
+                (end - self.start) / datetime.timedelta(hours=1),
+                '|'.join(self.texts))
+
+    def to_dict(self) -> Dict:
+        return {
+            'start': self.start.isoformat() if self.start is not None else None,
+            'texts': list(self.texts),
+            'pending_gap': ([self.pending_gap[0].isoformat(), self.pending_gap[1]]
+                            if self.pending_gap is not None else None),
+        }
+
+    def load_dict(self, state: Dict):
+        start = state['start']
+        self.start = datetime.datetime.fromisoformat(start) if start else None
+        self.texts = list(state['texts'])
+        pending = state['pending_gap']
+        self.pending_gap = ((datetime.datetime.fromisoformat(pending[0]), pending[1])
+                            if pending else None)
+
+
+class SessionBuilder:
+    """Incrementally builds one day's sessions from rows appended to its log.
+
+    add() updates every type's open session and running totals in constant
+    time per row, with the same gap rule as filter_wanted_activity. The open
+    sessions are reported the way extract_sessions treats a log that ends at
+    the last added row. State round-trips through to_dict/from_dict (plain
+    JSON types) so it can outlive the process.
+    """
+
+    def __init__(
+        self,
+        file_date: datetime.date,
+        activity_types: Optional[Dict[str, Dict[str, int]]] = None,
+    ):
+        self.file_date = file_date
+        self.activity_types = activity_types or ACTIVITY_TYPES
+        self._reset()
+
+    def _reset(self):
+        self.epoch = self._make_epoch(None)
+        self.rows_seen = 0
+        self.last_row = None
+        self._states = {act_type: _StreamState(**params)
+                        for act_type, params in self.activity_types.items()}
+        self._closed = {act_type: [] for act_type in self.activity_types}
+        self._closed_hours = {act_type: 0.0 for act_type in self.activity_types}
+
+    def _make_epoch(self, first_row: Optional[Tuple]) -> str:
+        """Identifies this run of the builder: the day and its first row.
+
+        Derived from the log alone, so every process (and a restart) following
+        the same log agrees on it, and it changes when the builder starts over
+        on a new day or a rewritten log.
+        """
+        key = str(self.file_date)
+        if first_row is not None:
+            timestamp, label, text = first_row
+            key += f'\t{timestamp.isoformat()}\t{label}\t{text}'
+        return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+    def add(self, timestamp: datetime.datetime, label: int, text: str):
+        """Consume one appended log row."""
+        if self.rows_seen == 0:
+            self.epoch = self._make_epoch((timestamp, label, text))
+        for act_type, state in self._states.items():
+            session = state.feed(timestamp, label, text)
+            if session:
+                self._closed[act_type].append(session)
+                self._closed_hours[act_type] += session[1]
+        self.rows_seen += 1
+        self.last_row = (timestamp, label, text)
+
+    def sync(self, df: pd.DataFrame):
+        """Consume the rows of a growing parsed log not seen yet.
+
+        If the frame no longer starts with the rows already consumed (the
+        file was rewritten), the builder starts over from the first row.
+        """
+        if self.rows_seen and not self._continues(df):
+            self._reset()
+
+        new = df.iloc[self.rows_seen:]
+        for timestamp, label, text in zip(new['Timestamp'].dt.to_pydatetime(),
+                                          new['Label'].tolist(),
+                                          new['Activity'].astype(str).tolist()):
+            self.add(timestamp, label, text)
+
+    def _continues(self, df: pd.DataFrame) -> bool:
+        if len(df) < self.rows_seen:
+            return False
+        row = df.iloc[self.rows_seen - 1]
+        return (row['Timestamp'], row['Label'], str(row['Activity'])) == self.last_row
+
+    def totals(self) -> Dict[str, float]:
+        """Hours per activity type, including sessions still open."""
+        totals = dict(self._closed_hours)
+        if self.last_row is not None:
+            for act_type, state in self._states.items():
+                totals[act_type] += state.current_hours(self.last_row[0])
+        return totals
+
+    def cursor(self) -> Dict:
+        """Position for closed_since(): the epoch and closed sessions per type."""
+        return {'epoch': self.epoch,
+                'closed': {t: len(s) for t, s in self._closed.items()}}
+
+    def closed_since(self, cursor: Dict) -> Optional[Dict[str, List[Tuple]]]:
+        """(start, hours, activity) sessions closed after `cursor`, per type.
+
+        None if the cursor is from another epoch (the builder started over)
+        or is ahead of this builder.
+        """
+        if cursor.get('epoch') != self.epoch:
+            return None
+        counts = cursor.get('closed', {})
+        if any(counts.get(t, 0) > len(s) for t, s in self._closed.items()):
+            return None
+        return {t: sessions[counts.get(t, 0):] for t, sessions in self._closed.items()}
+
+    def open_sessions(self) -> Dict[str, Optional[Tuple]]:
+        """Each type's open (start, hours, activity) session, or None."""
+        if self.last_row is None:
+            return {t: None for t in self._states}
+        return {t: state.current(self.last_row[0]) for t, state in self._states.items()}
+
+    def sessions(self) -> List[Dict]:
+        """Session dicts (as from extract_sessions_from_records) so far."""
+        weekday = self.file_date.weekday() + 1
+        out = []
+        for act_type, state in self._states.items():
+            sessions = list(self._closed[act_type])
+            if self.last_row is not None:
+                session = state.current(self.last_row[0])
+                if session:
+                    sessions.append(session)
+            out.extend({
+                'Date': self.file_date,
+                'Weekday': weekday,
+                'Activity': activity,
+                'StartTime': start,
+                'DurationHours': hours,
+                'Activity_Type': act_type,
+            } for start, hours, activity in sessions)
+        return out
+
+    def to_dict(self) -> Dict:
+        last_row = None
+        if self.last_row is not None:
+            timestamp, label, text = self.last_row
+            last_row = [timestamp.isoformat(), int(label), text]
+        return {
+            'file_date': self.file_date.isoformat(),
+            'activity_types': self.activity_types,
+            'epoch': self.epoch,
+            'rows_seen': self.rows_seen,
+            'last_row': last_row,
+            'states': {t: s.to_dict() for t, s in self._states.items()},
+            'closed': {
+                t: [[start.isoformat(), hours, activity]
+                    for start, hours, activity in sessions]
+                for t, sessions in self._closed.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'SessionBuilder':
+        builder = cls(datetime.date.fromisoformat(state['file_date']),
+                      state['activity_types'])
+        builder.epoch = state['epoch']
+        builder.rows_seen = state['rows_seen']
+        if state['last_row'] is not None:
+            timestamp, label, text = state['last_row']
+            builder.last_row = (datetime.datetime.fromisoformat(timestamp), label, text)
+        for act_type, type_state in state['states'].items():
+            builder._states[act_type].load_dict(type_state)
+        for act_type, sessions in state['closed'].items():
+            builder._closed[act_type] = [
+                (datetime.datetime.fromisoformat(start), hours, activity)
+                for start, hours, activity in sessions
+            ]
+            builder._closed_hours[act_type] = sum(s[1] for s in sessions)
+        return builder
+
+
+class TodaySessions:
+    """SessionBuilder for today's log, kept in sync by tailing the file.
+
+    Shared by the dashboard routes and the waste monitor so each appended row
+    is only processed once.
+    """
+
+    def __init__(self, log_dir: str = log_parser.DEFAULT_LOG_DIR):
+        self.log_dir = log_dir
+        self._builder = None
+        # TailLogReader version the builder was fed from; None after restore()
+        self._source_version = None
+        self._lock = threading.Lock()
+
+    def totals(self) -> Optional[Dict[str, float]]:
+        """Hours per activity type today, or None if there's no log yet."""
+        with self._lock:
+            builder = self._update()
+            return builder.totals() if builder else None
+
+    def sessions(self) -> Optional[pd.DataFrame]:
+        """Today's sessions frame, or None if there's no log yet."""
+        with self._lock:
+            builder = self._update()
+            return sessions_to_frame(builder.sessions()) if builder else None
+
+    def view(self) -> Optional[Tuple[pd.DataFrame, Dict[str, float], Dict]]:
+        """(sessions frame, totals, cursor) from one consistent builder state.
+
+        The cursor also lists the types whose last session is still open;
+        pass it to delta() to follow on from this view.
+        """
+        with self._lock:
+            builder = self._update()
+            if builder is None:
+                return None
+            cursor = builder.cursor()
+            cursor['open'] = [t for t, s in builder.open_sessions().items() if s]
+            return sessions_to_frame(builder.sessions()), builder.totals(), cursor
+
+    def delta(self, cursor: Optional[Dict]) -> Optional[Dict]:
+        """Changes since `cursor` (from view() or a previous delta()).
+
+        Returns None if there's no log yet, {'reset': True} if the builder
+        started over since the cursor (new day, rewritten log), and otherwise
+        {'cursor', 'totals', 'closed', 'open'}: sessions closed since the
+        cursor and each type's open session, per type.
+        """
+        with self._lock:
+            builder = self._update()
+            if builder is None:
+                return None
+            closed = builder.closed_since(cursor) if cursor else None
+            if closed is None:
+                return {'reset': True}
+            return {
+                'cursor': builder.cursor(),
+                'totals': builder.totals(),
+                'closed': closed,
+                'open': builder.open_sessions(),
+            }
+
+    def state(self) -> Optional[Dict]:
+        with self._lock:
+            return self._builder.to_dict() if self._builder else None
+
+    def restore(self, state: Optional[Dict]):
+        with self._lock:
+            self._builder = SessionBuilder.from_dict(state) if state else None
+            self._source_version = None
+
+    def _update(self) -> Optional[SessionBuilder]:
+        today = datetime.date.today()
+        reader = log_parser.get_today_reader(self.log_dir)
+        if reader is None:
+            return None
+        try:
+            df = reader.read()
+        except FileNotFoundError:
+            return None
+        if df.empty:
+            return None
+
+        rewritten = (self._source_version is not None
+                     and reader.version != self._source_version)
+        if self._builder is None or self._builder.file_date != today or rewritten:
+            self._builder = SessionBuilder(today)
+        self._source_version = reader.version
+        self._builder.sync(df)
+        return self._builder
+
+
+def extract_sessions_from_records(
+    records: Iterable,
+    file_date: datetime.date,
+) -> List[Dict]:
+    """Session dicts for all ACTIVITY_TYPES from a stream of log records.
+
+    Consumes (timestamp, label, text) records such as those yielded by
+    log_parser.iter_raw_log in one pass, without building a DataFrame. Returns
+    the same rows as process_day, in the same order; pass them through
+    sessions_to_frame if a DataFrame is needed.
+    """
+    builder = SessionBuilder(file_date)
+    for timestamp, label, text in records:
+        builder.add(timestamp, label, text)
+    return builder.sessions()
+
+
+def sessions_to_frame(sessions: List[Dict]) -> pd.DataFrame:
+    """DataFrame of session dicts, with process_day's columns."""
+    return pd.DataFrame(sessions, columns=SESSION_COLUMNS)
+
+
+def process_day(
+    df: pd.DataFrame,
+    file_date: datetime.date,
+    activity_types: Optional[Dict[str, Dict[str, int]]] = None,
+) -> pd.DataFrame:
+    """Extract sessions for all activity types from one segmentation of the day.
+
+    The label column is split into runs once; each type then only looks at
+    its own include-type runs, so adding types doesn't add passes over rows.
+    """
+    activity_types = activity_types or ACTIVITY_TYPES
+    table = SessionTable(list(activity_types))
+    process_day_into(table, df, file_date, activity_types)
+    return table.to_frame()
+
+
+def process_day_into(
+    table: SessionTable,
+    df: pd.DataFrame,
+    file_date: datetime.date,
+    activity_types: Optional[Dict[str, Dict[str, int]]] = None,
+):
+    """Append one day's sessions to a SessionTable (see process_day)."""
+    activity_types = activity_types or ACTIVITY_TYPES
+    runs = segment_runs(df['Label'].to_numpy())
+    runs_by_label = _runs_by_label(runs[0])
+
+    starts, ends, types = [], [], []
+    for act_type, params in activity_types.items():
+        type_starts, type_ends = _type_bounds(runs, runs_by_label, **params)
+        starts.append(type_starts)
+        ends.append(type_ends)
+        types.append(np.full(len(type_starts), table.type_code(act_type), dtype=np.int8))
+
+    _add_day_sessions(table, df, file_date, np.concatenate(starts),
+                      np.concatenate(ends), np.concatenate(types))
+
+
+class DayProcessPool:
+    """Long-lived process pool for process_range, started on first use.
+
+    Worker processes are spawned rather than forked (a request thread may be
+    forking a multi-threaded server process) and are kept for the life of
+    the owner, so only the first parallel range pays their startup. A pool
+    inherited across fork() is replaced in the child.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(cancel_futures=True)
+            self._executor = None
 
 
 def process_range(
     file_dict: Dict[datetime.date, str],
     read_fn: Callable,
+    pool: Optional[DayProcessPool] = None,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
 ) -> pd.DataFrame:
-    """Process multiple days of logs."""
-    dfs = []
+    """Process multiple days of logs.
+
+    With a pool, ranges of more than `chunk_days` days have their files read
+    on a thread pool and are processed in batches of `chunk_days` on the
+    pool's processes; shorter ranges are processed in-line, where they are
+    cheaper than the round trip. Rows come back in the same order either way.
+    """
+    return process_range_table(file_dict, read_fn, pool, chunk_days).to_frame()
+
+
+def process_range_table(
+    file_dict: Dict[datetime.date, str],
+    read_fn: Callable,
+    pool: Optional[DayProcessPool] = None,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+) -> SessionTable:
+    """process_range, returning the SessionTable instead of a DataFrame."""
+    if pool is not None and pool.workers > 1 and len(file_dict) > chunk_days:
+        return _process_range_parallel(file_dict, read_fn, pool, chunk_days)
+
+    table = SessionTable()
     for file_date, path in file_dict.items():
         raw_df = read_fn(path)
         if raw_df.empty:
             continue
-        day_df = process_day(raw_df, file_date)
-        if not day_df.empty:
-            dfs.append(day_df)
+        process_day_into(table, raw_df, file_date)
+    return table
+
 
-    if not dfs:
-        return pd.DataFrame(columns=[
-            'Date', 'Weekday', 'Activity', 'StartTime',
-            'DurationHours', 'Activity_Type'
-        ])
-    return pd.concat(dfs, ignore_index=True)
+def _process_batch(
+    batch: List[Tuple[datetime.date, pd.DataFrame]],
+) -> SessionTable:
+    """Process a batch of days in a worker process."""
+    table = SessionTable()
+    for file_date, raw_df in batch:
+        process_day_into(table, raw_df, file_date)
+    return table
+
+
+def _process_range_parallel(
+    file_dict: Dict[datetime.date, str],
+    read_fn: Callable,
+    pool: DayProcessPool,
+    chunk_days: int,
+) -> SessionTable:
+    dates = list(file_dict)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=pool.workers) as readers:
+        raw_dfs = list(readers.map(read_fn, file_dict.values()))
+
+    days = [(d, df) for d, df in zip(dates, raw_dfs) if not df.empty]
+    batches = [days[i:i + chunk_days] for i in range(0, len(days), chunk_days)]
+
+    table = SessionTable()
+    for batch_table in pool.executor().map(_process_batch, batches):
+        table.extend(batch_table)
+    return table
 
 
 def aggregate_daily(sessions: pd.DataFrame) -> pd.DataFrame:
@@ -163,3 +865,337 @@ def aggregate_total(sessions: pd.DataFrame) -> pd.DataFrame:
     ).reset_index()
 
     return agg
+
+
+# Chart buckets, and the longest span in days auto_bucket picks each one for
+BUCKETS = {'day': 92, 'week': 731, 'month': None}
+
+
+def auto_bucket(start: datetime.date, end: datetime.date) -> str:
+    """Coarsest-needed bucket that keeps a span's charts to a few hundred points."""
+    span = (end - start).days + 1
+    for bucket, max_days in BUCKETS.items():
+        if max_days is None or span <= max_days:
+            return bucket
+    return 'month'
+
+
+def bucket_start(file_date: datetime.date, bucket: str) -> datetime.date:
+    """First day of the bucket (Monday for weeks) containing file_date."""
+    if bucket == 'week':
+        return file_date - datetime.timedelta(days=file_date.weekday())
+    if bucket == 'month':
+        return file_date.replace(day=1)
+    return file_date
+
+
+def aggregate_buckets(daily_agg: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """Sum a daily aggregate's hours into week or month buckets.
+
+    Date becomes each bucket's first day. SessionCount and MaxHours (as in
+    DailyRollup.daily) are summed and maxed if present; Weekday is dropped.
+    'day' returns daily_agg unchanged.
+    """
+    if bucket == 'day' or daily_agg.empty:
+        return daily_agg
+
+    aggs = {'DurationHours': ('DurationHours', 'sum')}
+    if 'SessionCount' in daily_agg:
+        aggs['SessionCount'] = ('SessionCount', 'sum')
+    if 'MaxHours' in daily_agg:
+        aggs['MaxHours'] = ('MaxHours', 'max')
+
+    starts = {d: bucket_start(d, bucket) for d in daily_agg['Date'].unique()}
+    agg = daily_agg.assign(Date=daily_agg['Date'].map(starts)).groupby(
+        ['Date', 'Activity_Type'], as_index=False
+    ).agg(**aggs)
+
+    return agg.sort_values(['Date', 'Activity_Type'])
+
+
+class DailyRollup:
+    """Persisted (Date, Activity_Type) -> hours / session count / max session.
+
+    Each day's rows are rebuilt only when its source file's fingerprint
+    changes, so range queries read a few small rows per day instead of
+    reprocessing raw logs. The table is pickled under `cache_dir`.
+    """
+
+    _FORMAT = 1
+
+    def __init__(self, cache_dir: Optional[str] = log_parser.DEFAULT_CACHE_DIR):
+        self.path = os.path.join(cache_dir, 'rollup.pkl') if cache_dir else None
+        # date -> (fingerprint, {act_type: (hours, session_count, max_hours)})
+        self._days = {}
+        self._version = 0
+        self._index = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def update(
+        self,
+        file_dict: Dict[datetime.date, str],
+        read_fn: Callable,
+        pool: Optional[DayProcessPool] = None,
+        date_range: Optional[Tuple[datetime.date, datetime.date]] = None,
+    ) -> int:
+        """Rebuild the days in file_dict whose files changed; returns how many.
+
+        If date_range is given, days inside it that are no longer in
+        file_dict (deleted logs) are dropped.
+        """
+        fingerprints = {d: log_parser.file_fingerprint(p) for d, p in file_dict.items()}
+        with self._lock:
+            stale = {d: p for d, p in file_dict.items()
+                     if d not in self._days or self._days[d][0] != fingerprints[d]}
+            if date_range is not None:
+                removed = [d for d in self._days
+                           if date_range[0] <= d <= date_range[1] and d not in file_dict]
+                for file_date in removed:
+                    del self._days[file_date]
+                if removed:
+                    self._version += 1
+                    if not stale:
+                        self._save()
+        if not stale:
+            return 0
+
+        # Rollups don't need activity texts, so they are never joined
+        sessions = process_range_table(stale, read_fn, pool).to_frame(
+            with_activity=False)
+        rebuilt = {d: (fingerprints[d], {}) for d in stale}
+        if not sessions.empty:
+            grouped = sessions.groupby(['Date', 'Activity_Type'])['DurationHours']
+            for (file_date, act_type), hours in grouped:
+                rebuilt[file_date][1][act_type] = (
+                    float(hours.sum()), int(hours.count()), float(hours.max()))
+
+        with self._lock:
+            self._days.update(rebuilt)
+            self._version += 1
+            self._save()
+        return len(stale)
+
+    def range_totals(self, start: datetime.date, end: datetime.date) -> 'RangeTotals':
+        """Per-type totals between start and end (inclusive) from the prefix sums."""
+        with self._lock:
+            if self._index is None or self._index.version != self._version:
+                self._index = RangeTotalsIndex(self._days, list(ACTIVITY_TYPES),
+                                               self._version)
+            index = self._index
+        return index.query(start, end)
+
+    def daily(self, dates: Iterable[datetime.date]) -> pd.DataFrame:
+        """Per-day rows like aggregate_daily, plus SessionCount and MaxHours."""
+        rows = []
+        with self._lock:
+            for file_date in sorted(dates):
+                entry = self._days.get(file_date)
+                if entry is None:
+                    continue
+                for act_type, (hours, count, max_hours) in sorted(entry[1].items()):
+                    rows.append((file_date, act_type, hours,
+                                 file_date.weekday() + 1, count, max_hours))
+        return pd.DataFrame(rows, columns=ROLLUP_COLUMNS)
+
+    def totals(self, dates: Iterable[datetime.date]) -> pd.DataFrame:
+        """Per-type rows like aggregate_total over the given days."""
+        daily = self.daily(dates)
+        if daily.empty:
+            return pd.DataFrame(columns=[
+                'Activity_Type', 'TotalHours', 'MeanHoursPerDay', 'SessionCount'])
+
+        agg = daily.groupby('Activity_Type').agg(
+            TotalHours=('DurationHours', 'sum'),
+            SessionCount=('SessionCount', 'sum'),
+        ).reset_index()
+        # Same definition as aggregate_total: mean over sessions
+        agg['MeanHoursPerDay'] = agg['TotalHours'] / agg['SessionCount']
+        return agg[['Activity_Type', 'TotalHours', 'MeanHoursPerDay', 'SessionCount']]
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                blob = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.warning("Discarding unreadable rollup at %s", self.path)
+            return
+        if blob.get('format') != self._FORMAT:
+            return
+        if blob.get('activity_types') != ACTIVITY_TYPES:
+            return
+        self._days = blob['days']
+
+    def _save(self):
+        if not self.path:
+            return
+        blob = {
+            'format': self._FORMAT,
+            'activity_types': ACTIVITY_TYPES,
+            'days': self._days,
+        }
+        # A private temp file per write, since several processes (e.g. server
+        # workers) may save the same rollup at once
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(blob, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.exception("Failed to write rollup to %s", self.path)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class RangeTotals(NamedTuple):
+    """Totals over a date range; dicts are keyed by activity type."""
+    hours: Dict[str, float]
+    sessions: Dict[str, int]
+    num_days: int
+
+
+class RangeTotalsIndex:
+    """Prefix sums of daily per-type totals over a dense calendar.
+
+    Missing days count as zero, so the totals for any date range are two
+    lookups and a subtraction per type.
+    """
+
+    def __init__(self, days: Dict, act_types: List[str], version: int = 0):
+        self.act_types = act_types
+        self.version = version
+        self.first = min(days) if days else None
+        n = (max(days) - self.first).days + 1 if days else 0
+
+        hours = np.zeros((len(act_types), n + 1))
+        sessions = np.zeros((len(act_types), n + 1), dtype=np.int64)
+        tracked = np.zeros(n + 1, dtype=np.int64)
+        positions = {act_type: i for i, act_type in enumerate(act_types)}
+        for file_date, (_, per_type) in days.items():
+            day = (file_date - self.first).days + 1
+            for act_type, (type_hours, count, _) in per_type.items():
+                if act_type not in positions:
+                    continue
+                hours[positions[act_type], day] = type_hours
+                sessions[positions[act_type], day] = count
+            # A day counts as tracked if it has any session (as in aggregate_daily)
+            tracked[day] = 1 if per_type else 0
+
+        self._hours = np.cumsum(hours, axis=1)
+        self._sessions = np.cumsum(sessions, axis=1)
+        self._tracked = np.cumsum(tracked)
+        self._n = n
+
+    def query(self, start: datetime.date, end: datetime.date) -> RangeTotals:
+        if self.first is None:
+            lo = hi = 0
+        else:
+            lo = min(max((start - self.first).days, 0), self._n)
+            hi = min(max((end - self.first).days + 1, 0), self._n)
+            hi = max(hi, lo)
+
+        hours = self._hours[:, hi] - self._hours[:, lo]
+        sessions = self._sessions[:, hi] - self._sessions[:, lo]
+        return RangeTotals(
+            hours={t: float(h) for t, h in zip(self.act_types, hours)},
+            sessions={t: int(c) for t, c in zip(self.act_types, sessions)},
+            num_days=int(self._tracked[hi] - self._tracked[lo]),
+        )
+
+
+# Trailing windows in days; 'week' and 'month' are calendar week/month to date
+ROLLING_WINDOWS = {'7d': 7, '28d': 28, '90d': 90, 'week': None, 'month': None}
+
+
+class RollingEngine:
+    """Rolling averages of daily per-type hours over a dense calendar.
+
+    Days without a log or without sessions of a type count as zero hours,
+    so a window always spans the same number of calendar days. Windows
+    that start before the first day are averaged over the days available.
+    All windows are computed from one cumulative sum.
+    """
+
+    def __init__(self, act_types: List[str], first: datetime.date):
+        self.act_types = list(act_types)
+        self.first = first
+        self._n = 0
+        # Column i + 1 holds the cumulative hours up to and including day i
+        self._cum = np.zeros((len(self.act_types), 1))
+
+    @classmethod
+    def from_daily(
+        cls,
+        daily_agg: pd.DataFrame,
+        act_types: Optional[List[str]] = None,
+        date_range: Optional[Tuple[datetime.date, datetime.date]] = None,
+    ) -> 'RollingEngine':
+        """Engine over a daily aggregate (Date, Activity_Type, DurationHours).
+
+        The calendar spans date_range if given, else the aggregate's dates.
+        """
+        act_types = act_types or list(ACTIVITY_TYPES)
+        if date_range is None:
+            if daily_agg.empty:
+                date_range = (datetime.date.today(), datetime.date.today())
+            else:
+                date_range = (min(daily_agg['Date']), max(daily_agg['Date']))
+        first, last = date_range
+        engine = cls(act_types, first)
+
+        n = (last - first).days + 1
+        hours = np.zeros((len(act_types), n))
+        positions = {t: i for i, t in enumerate(act_types)}
+        for file_date, act_type, type_hours in zip(
+                daily_agg['Date'], daily_agg['Activity_Type'], daily_agg['DurationHours']):
+            day = (file_date - first).days
+            if act_type in positions and 0 <= day < n:
+                hours[positions[act_type], day] += type_hours
+
+        engine._cum = np.zeros((len(act_types), n + 1))
+        engine._cum[:, 1:] = np.cumsum(hours, axis=1)
+        engine._n = n
+        return engine
+
+    @property
+    def last(self) -> datetime.date:
+        return self.first + datetime.timedelta(days=self._n - 1)
+
+    def dates(self) -> List[datetime.date]:
+        return [self.first + datetime.timedelta(days=i) for i in range(self._n)]
+
+    def daily_hours(self) -> np.ndarray:
+        """(types, days) array of each day's hours."""
+        return np.diff(self._cum[:, :self._n + 1], axis=1)
+
+    def bucket_ends(self, bucket: str = 'day') -> np.ndarray:
+        """Day positions closing each bucket (the last day is always included)."""
+        if bucket == 'day':
+            return np.arange(self._n)
+        dates = self.dates()
+        starts = [bucket_start(d, bucket) for d in dates]
+        return np.array([i for i in range(self._n)
+                         if i == self._n - 1 or starts[i + 1] != starts[i]],
+                        dtype=np.int64)
+
+    def rolling(self, window: str = '7d') -> np.ndarray:
+        """(types, days) array of the window's average hours per day."""
+        ends = np.arange(1, self._n + 1)
+        span = ROLLING_WINDOWS[window]
+        if span is not None:
+            starts = np.maximum(ends - span, 0)
+        else:
+            dates = self.dates()
+            if window == 'week':
+                offsets = np.array([d.weekday() for d in dates], dtype=np.int64)
+            else:
+                offsets = np.array([d.day - 1 for d in dates], dtype=np.int64)
+            starts = np.maximum(ends - 1 - offsets, 0)
+
+        sums = self._cum[:, ends] - self._cum[:, starts]
+        return sums / (ends - starts)
@@ -1,24 +1,290 @@
 """Flask app factory and routes for the productivity dashboard."""
 
+import atexit
 import datetime
+import hashlib
+import json
 import logging
-
-from flask import Flask, redirect, render_template, request, jsonify
-
-from . import log_parser, analytics, charts
+import os
+import signal
+import sys
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import Flask, Response, make_response, redirect, render_template, request, jsonify
+
+from . import log_parser, analytics, archive, charts, snapshot
+from .memo import Memo, DEFAULT_MEMO_BYTES, DEFAULT_MEMO_ENTRIES
 from .monitor import WasteMonitor
+from .warmer import PrecomputeWarmer, DEFAULT_WARM_POLL, DEFAULT_WARM_WINDOWS
 
 LOG_DIR = log_parser.DEFAULT_LOG_DIR
-
-
-def create_app(start_monitor: bool = True) -> Flask:
+CACHE_DIR = log_parser.DEFAULT_CACHE_DIR
+ARCHIVE_DIR = archive.DEFAULT_ARCHIVE_DIR
+
+# Longest range (in days of logs) that /range also draws a session timeline for
+TIMELINE_MAX_DAYS = 31
+
+# Columns the JSON API can return, selectable with ?fields=a,b
+API_RANGE_FIELDS = ['Date', 'Activity_Type', 'DurationHours', 'SessionCount', 'MaxHours']
+API_SUMMARY_FIELDS = ['Activity_Type', 'TotalHours', 'AvgHoursPerDay', 'SessionCount']
+API_SESSION_FIELDS = analytics.SESSION_COLUMNS
+
+# Query parameters each route reads; routes only see these (see _query_args),
+# and the warmer checks WARM_WINDOWS urls against PAGE_PARAMS
+TODAY_PARAMS: FrozenSet[str] = frozenset()
+RANGE_PARAMS = frozenset({'start', 'end', 'window', 'bucket'})
+SUMMARY_PARAMS = frozenset({'start', 'end'})
+API_RANGE_PARAMS = frozenset({'start', 'end', 'bucket', 'fields'})
+API_SUMMARY_PARAMS = frozenset({'start', 'end', 'fields'})
+API_SESSION_PARAMS = frozenset({'start', 'end', 'fields'})
+STREAM_PARAMS = frozenset({'cursor'})
+
+# Pages the warmer can render (not /api/today/stream, which never finishes)
+PAGE_PARAMS = {
+    '/today': TODAY_PARAMS,
+    '/range': RANGE_PARAMS,
+    '/summary': SUMMARY_PARAMS,
+    '/api/today': TODAY_PARAMS,
+    '/api/range': API_RANGE_PARAMS,
+    '/api/summary': API_SUMMARY_PARAMS,
+    '/api/sessions': API_SESSION_PARAMS,
+}
+
+# Seconds of silence after which the today stream sends an SSE comment, so
+# proxies and browsers keep the connection open
+STREAM_KEEPALIVE_SECONDS = 15
+# Milliseconds browsers wait before reconnecting once a stream response ends
+STREAM_RETRY_MS = 1000
+
+
+def _query_args(params: FrozenSet[str]) -> Dict[str, str]:
+    """The request's query parameters among `params`; others are ignored."""
+    return {name: value for name, value in request.args.items() if name in params}
+
+
+def _columnar(frame: pd.DataFrame, fields: List[str]) -> Dict[str, Any]:
+    """Frame columns as JSON-ready arrays: dates as ISO strings, floats rounded."""
+    columns = {}
+    for field in fields:
+        values = frame[field]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns[field] = np.datetime_as_string(
+                values.to_numpy(dtype='datetime64[s]')).tolist()
+        elif pd.api.types.is_float_dtype(values):
+            columns[field] = np.round(values.to_numpy(dtype=np.float64),
+                                      charts.PAYLOAD_DECIMALS)
+        elif pd.api.types.is_integer_dtype(values):
+            columns[field] = np.ascontiguousarray(values.to_numpy(dtype=np.int64))
+        else:
+            columns[field] = [v.isoformat() if isinstance(v, datetime.date) else v
+                              for v in values]
+    return columns
+
+
+def create_app(start_monitor: bool = True, warm_start: bool = True,
+               start_threads: bool = True,
+               config: Optional[Dict[str, Any]] = None) -> Flask:
+    """Build the dashboard app.
+
+    Settings take their defaults below, then PRODLOG_* environment variables
+    (e.g. PRODLOG_PROCESS_WORKERS=4; values are parsed as JSON where they can
+    be), then `config`.
+
+    The waste monitor, snapshot writer and precompute warmer are registered as
+    extensions and, unless `start_threads` is False, started right away; a
+    pre-forking server leaves them stopped and starts them after fork (see
+    serve.py).
+    """
     app = Flask(__name__)
     app.config['LOG_DIR'] = LOG_DIR
+    app.config['CACHE_DIR'] = CACHE_DIR
+    app.config['ARCHIVE_DIR'] = ARCHIVE_DIR
+    # Worker processes for multi-day processing; 0 or 1 processes on the
+    # request thread
+    app.config['PROCESS_WORKERS'] = 0
+    # 'data' embeds compact chart payloads laid out client-side; 'figure'
+    # embeds full Plotly figure JSON
+    app.config['CHART_PAYLOAD'] = 'data'
+    app.config['SNAPSHOT_INTERVAL'] = snapshot.DEFAULT_SNAPSHOT_INTERVAL
+    app.config['SNAPSHOT_MEMO_BYTES'] = snapshot.DEFAULT_SNAPSHOT_MEMO_BYTES
+    app.config['MEMO_MAX_ENTRIES'] = DEFAULT_MEMO_ENTRIES
+    app.config['MEMO_MAX_BYTES'] = DEFAULT_MEMO_BYTES
+    # Seconds between checks of today's log by each /api/today/stream client
+    app.config['TODAY_STREAM_POLL'] = 2.0
+    # Seconds one /api/today/stream response lasts before the browser is left
+    # to reconnect, so open tabs don't each hold a request thread for good
+    app.config['TODAY_STREAM_MAX'] = 60.0
+    # Page URLs rendered in the background so their data is memoized before
+    # anyone asks (not /api/today/stream); empty disables the warmer
+    app.config['WARM_WINDOWS'] = list(DEFAULT_WARM_WINDOWS)
+    app.config['WARM_POLL'] = DEFAULT_WARM_POLL
+
+    app.config.from_prefixed_env('PRODLOG')
+    app.config.update(config or {})
+    # Follows CACHE_DIR unless set explicitly
+    app.config.setdefault('SNAPSHOT_PATH',
+                          os.path.join(app.config['CACHE_DIR'], 'snapshot.pkl'))
+
+    day_cache = log_parser.ParsedDayCache(cache_dir=app.config['CACHE_DIR'])
+    app.extensions['day_cache'] = day_cache
+    log_archive = archive.LogArchive(app.config['ARCHIVE_DIR'])
+    app.extensions['log_archive'] = log_archive
+
+    # Shared by every multi-day computation; its processes start on first use
+    process_pool = None
+    if app.config['PROCESS_WORKERS'] > 1:
+        process_pool = analytics.DayProcessPool(app.config['PROCESS_WORKERS'])
+        atexit.register(process_pool.shutdown)
+    app.extensions['process_pool'] = process_pool
+
+    rollup = analytics.DailyRollup(cache_dir=app.config['CACHE_DIR'])
+    app.extensions['rollup'] = rollup
+
+    today_sessions = analytics.TodaySessions(app.config['LOG_DIR'])
+    app.extensions['today_sessions'] = today_sessions
+
+    # Sessions, aggregates and chart JSON keyed by range and source fingerprint,
+    # shared by every route and the waste monitor
+    memo = Memo(app.config['MEMO_MAX_ENTRIES'], app.config['MEMO_MAX_BYTES'])
+    app.extensions['memo'] = memo
+
+    def chart_json(name: str, key: tuple, args: Callable[[], tuple]) -> str:
+        """Memoized output of charts.<name> (or <name>_data, per CHART_PAYLOAD).
+
+        `args` produces the builder's arguments and is only called on a miss.
+        """
+        if app.config['CHART_PAYLOAD'] == 'data':
+            name += '_data'
+        build = getattr(charts, name)
+        return memo.get((name,) + key, lambda: build(*args()))
+
+    def today_fingerprint() -> Tuple[datetime.date, str]:
+        today_date = datetime.date.today()
+        return today_date, log_parser.files_fingerprint(
+            {today_date: log_parser.today_log_path(app.config['LOG_DIR'])})
+
+    def today_view(today_date: datetime.date, fingerprint: str
+                   ) -> Optional[Tuple[pd.DataFrame, Dict[str, float], Dict]]:
+        return memo.get(('today_view', today_date, fingerprint), today_sessions.view)
+
+    def today_totals() -> Optional[Dict[str, float]]:
+        today_date, fingerprint = today_fingerprint()
+        return memo.get(('today_totals', today_date, fingerprint),
+                        today_sessions.totals)
+
+    # Folded into every ETag so a restart (e.g. with new templates) never
+    # answers 304 for a page rendered by a previous process
+    etag_salt = f'{os.getpid()}-{time.time_ns()}'
+
+    def page_etag(*parts) -> str:
+        parts = (etag_salt, app.config['CHART_PAYLOAD']) + parts
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def conditional_page(etag: str, render: Callable[[], str]):
+        """304 if the browser already has `etag`, else the rendered page."""
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = make_response(render())
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+
+    def date_range_args(args: Dict[str, str]
+                        ) -> Tuple[str, str, datetime.date, datetime.date]:
+        """start/end query params (default: the past 18 days) and their dates."""
+        end_str = args.get('end', datetime.date.today().isoformat())
+        start_str = args.get('start',
+            (datetime.date.today() - datetime.timedelta(days=18)).isoformat())
+
+        start_date = datetime.datetime.strptime(start_str, "%Y-%m-%d").date()
+        end_date = datetime.datetime.strptime(end_str, "%Y-%m-%d").date()
+        return start_str, end_str, start_date, end_date
+
+    def update_rollup(file_dict, start_date, end_date):
+        rollup.update(file_dict, log_archive.reader(day_cache.read),
+                      pool=process_pool,
+                      date_range=(start_date, end_date))
+
+    def range_daily(file_dict, start_date, end_date, fingerprint) -> pd.DataFrame:
+        """Rollup rows for the range's logs, rebuilding changed days first."""
+        def compute():
+            update_rollup(file_dict, start_date, end_date)
+            return rollup.daily(file_dict)
+        return memo.get(('daily', start_date, end_date, fingerprint), compute)
+
+    def range_summary(file_dict, start_date, end_date,
+                      fingerprint) -> Tuple[Dict[str, Dict], int]:
+        def compute():
+            if not file_dict:
+                return {}, 0
+            update_rollup(file_dict, start_date, end_date)
+            return summary_stats(start_date, end_date)
+        return memo.get(('summary', start_date, end_date, fingerprint), compute)
+
+    def range_sessions(file_dict, start_date, end_date,
+                       fingerprint) -> analytics.SessionTable:
+        return memo.get(
+            ('sessions', start_date, end_date, fingerprint),
+            lambda: analytics.process_range_table(
+                file_dict, log_archive.reader(day_cache.read),
+                pool=process_pool))
+
+    def summary_stats(start_date, end_date) -> Tuple[Dict[str, Dict], int]:
+        """Per-type total/avg/sessions over the range, and the days it spans."""
+        totals = rollup.range_totals(start_date, end_date)
+
+        # Per-day averages
+        num_days = totals.num_days or 1
+        stats = {}
+        for act_type in sorted(totals.hours):
+            if not totals.sessions[act_type]:
+                continue
+            stats[act_type] = {
+                'total': totals.hours[act_type],
+                'avg': totals.hours[act_type] / num_days,
+                'sessions': totals.sessions[act_type],
+            }
+        return stats, num_days
+
+    def api_fields(args: Dict[str, str], available: List[str]) -> Optional[List[str]]:
+        """?fields=a,b as a list (default: all), or None if any is unknown."""
+        fields = args.get('fields')
+        if not fields:
+            return list(available)
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        if not fields or any(f not in available for f in fields):
+            return None
+        return fields
+
+    def api_date_range(args: Dict[str, str]
+                       ) -> Optional[Tuple[str, str, datetime.date, datetime.date]]:
+        """date_range_args(), or None if start/end isn't a YYYY-MM-DD date."""
+        try:
+            return date_range_args(args)
+        except ValueError:
+            return None
+
+    def api_error(message: str):
+        return jsonify({'error': message}), 400
+
+    def api_response(payload: Dict[str, Any]):
+        return app.response_class(charts.dumps(payload), mimetype='application/json')
+
+    if warm_start:
+        snapshot.load_snapshot(app, app.config['SNAPSHOT_PATH'])
+        app.extensions['snapshot_writer'] = snapshot.SnapshotWriter(
+            app, app.config['SNAPSHOT_PATH'], app.config['SNAPSHOT_INTERVAL'])
 
     if start_monitor:
-        monitor = WasteMonitor(log_dir=LOG_DIR)
-        monitor.start()
-        app.extensions['waste_monitor'] = monitor
+        app.extensions['waste_monitor'] = WasteMonitor(
+            log_dir=app.config['LOG_DIR'], today_sessions=today_sessions,
+            totals_fn=today_totals)
+
+    app.extensions['warmer'] = PrecomputeWarmer(app, PAGE_PARAMS, app.config['WARM_POLL'])
 
     @app.route('/')
     def index():
@@ -26,98 +292,130 @@ def create_app(start_monitor: bool = True) -> Flask:
 
     @app.route('/today')
     def today():
-        df = log_parser.get_today_log(app.config['LOG_DIR'])
-        today_date = datetime.date.today()
+        today_date, fingerprint = today_fingerprint()
+        return conditional_page(page_etag('today', today_date, fingerprint),
+                                lambda: render_today(today_date, fingerprint))
+
+    def render_today(today_date: datetime.date, fingerprint: str) -> str:
+        view = today_view(today_date, fingerprint)
 
-        if df is None or df.empty:
+        if view is None:
             return render_template('today.html',
                                    date=today_date,
                                    bar_json='null',
                                    timeline_json='null',
+                                   cursor_json='null',
                                    has_data=False,
                                    stats={})
-
-        sessions = analytics.process_day(df, today_date)
-        daily_agg = analytics.aggregate_daily(sessions)
+        sessions, totals, cursor = view
 
         # Build stats
         stats = {}
         for act_type in ['deep_work', 'light_work', 'wasted']:
-            subset = daily_agg[daily_agg['Activity_Type'] == act_type]
-            stats[act_type] = subset['DurationHours'].sum() if not subset.empty else 0
+            stats[act_type] = totals.get(act_type, 0)
 
-        bar_json = charts.today_breakdown_bar(daily_agg)
-        timeline_json = charts.today_timeline(sessions)
+        bar_json = chart_json('today_breakdown_bar', (today_date, fingerprint),
+                              lambda: (analytics.aggregate_daily(sessions),))
+        timeline_json = chart_json('today_timeline', (today_date, fingerprint),
+                                   lambda: (sessions,))
 
         return render_template('today.html',
                                date=today_date,
                                bar_json=bar_json,
                                timeline_json=timeline_json,
+                               cursor_json=json.dumps(cursor),
                                has_data=True,
                                stats=stats)
 
     @app.route('/range')
     def range_view():
-        end_str = request.args.get('end', datetime.date.today().isoformat())
-        start_str = request.args.get('start',
-            (datetime.date.today() - datetime.timedelta(days=18)).isoformat())
-
-        start_date = datetime.datetime.strptime(start_str, "%Y-%m-%d").date()
-        end_date = datetime.datetime.strptime(end_str, "%Y-%m-%d").date()
+        args = _query_args(RANGE_PARAMS)
+        start_str, end_str, start_date, end_date = date_range_args(args)
+        window = args.get('window', '7d')
+        if window not in analytics.ROLLING_WINDOWS:
+            window = '7d'
+        # 'auto' (or anything unknown) sizes buckets to the span of logs found
+        bucket_param = args.get('bucket', 'auto')
+        if bucket_param not in analytics.BUCKETS:
+            bucket_param = 'auto'
 
         file_dict = log_parser.get_raw_files(
             app.config['LOG_DIR'], date_range=(start_date, end_date))
+        fingerprint = log_parser.files_fingerprint(file_dict)
 
+        bucket = bucket_param
+        if bucket == 'auto':
+            bucket = analytics.auto_bucket(min(file_dict), max(file_dict)) \
+                if file_dict else 'day'
+
+        etag = page_etag('range', start_str, end_str, window, bucket_param, fingerprint)
+        return conditional_page(etag, lambda: render_range(
+            start_str, end_str, start_date, end_date, window, bucket_param, bucket,
+            file_dict, fingerprint))
+
+    def render_range(start_str, end_str, start_date, end_date, window,
+                     bucket_param, bucket, file_dict, fingerprint) -> str:
         if not file_dict:
             return render_template('range.html',
-                                   start=start_str, end=end_str,
+                                   start=start_str, end=end_str, window=window,
+                                   bucket=bucket_param,
                                    bar_json='null', trend_json='null',
-                                   has_data=False)
-
-        sessions = analytics.process_range(file_dict, log_parser.read_raw_log)
-        daily_agg = analytics.aggregate_daily(sessions)
-
-        bar_json = charts.range_stacked_bar(daily_agg)
-        trend_json = charts.range_trend_lines(daily_agg)
+                                   timeline_json='null', has_data=False)
+
+        def daily_agg() -> pd.DataFrame:
+            return range_daily(file_dict, start_date, end_date, fingerprint)
+
+        bar_json = chart_json(
+            'range_stacked_bar', (start_date, end_date, bucket, fingerprint),
+            lambda: (daily_agg(), bucket))
+        trend_json = chart_json(
+            'range_trend_lines', (start_date, end_date, window, bucket, fingerprint),
+            lambda: (analytics.RollingEngine.from_daily(daily_agg()), window, bucket))
+
+        timeline_json = 'null'
+        if len(file_dict) <= TIMELINE_MAX_DAYS:
+            timeline_json = chart_json(
+                'range_timeline', (start_date, end_date, fingerprint),
+                lambda: (range_sessions(
+                    file_dict, start_date, end_date, fingerprint
+                ).to_frame(max_activity_chars=charts.HOVER_CHARS),))
 
         return render_template('range.html',
-                               start=start_str, end=end_str,
+                               start=start_str, end=end_str, window=window,
+                               bucket=bucket_param,
                                bar_json=bar_json, trend_json=trend_json,
-                               has_data=True)
+                               timeline_json=timeline_json, has_data=True)
 
     @app.route('/summary')
     def summary():
-        end_str = request.args.get('end', datetime.date.today().isoformat())
-        start_str = request.args.get('start',
-            (datetime.date.today() - datetime.timedelta(days=18)).isoformat())
-
-        start_date = datetime.datetime.strptime(start_str, "%Y-%m-%d").date()
-        end_date = datetime.datetime.strptime(end_str, "%Y-%m-%d").date()
+        start_str, end_str, start_date, end_date = date_range_args(
+            _query_args(SUMMARY_PARAMS))
 
         file_dict = log_parser.get_raw_files(
             app.config['LOG_DIR'], date_range=(start_date, end_date))
+        fingerprint = log_parser.files_fingerprint(file_dict)
+
+        etag = page_etag('summary', start_str, end_str, fingerprint)
+        return conditional_page(etag, lambda: render_summary(
+            start_str, end_str, start_date, end_date, file_dict, fingerprint))
 
+    def render_summary(start_str, end_str, start_date, end_date,
+                       file_dict, fingerprint) -> str:
         if not file_dict:
             return render_template('summary.html',
                                    start=start_str, end=end_str,
                                    pie_json='null',
                                    has_data=False, stats={}, num_days=0)
 
-        sessions = analytics.process_range(file_dict, log_parser.read_raw_log)
-        total_agg = analytics.aggregate_total(sessions)
-        daily_agg = analytics.aggregate_daily(sessions)
-
-        # Per-day averages
-        num_days = daily_agg['Date'].nunique() if not daily_agg.empty else 1
-        stats = {}
-        for _, row in total_agg.iterrows():
-            stats[row['Activity_Type']] = {
-                'total': row['TotalHours'],
-                'avg': row['TotalHours'] / num_days,
-                'sessions': int(row['SessionCount']),
-            }
+        stats, num_days = range_summary(file_dict, start_date, end_date, fingerprint)
+        total_agg = pd.DataFrame({
+            'Activity_Type': list(stats),
+            'TotalHours': [s['total'] for s in stats.values()],
+            'SessionCount': [s['sessions'] for s in stats.values()],
+        })
 
-        pie_json = charts.summary_pie(total_agg)
+        pie_json = chart_json('summary_pie', (start_date, end_date, fingerprint),
+                              lambda: (total_agg,))
 
         return render_template('summary.html',
                                start=start_str, end=end_str,
@@ -128,20 +426,15 @@ def create_app(start_monitor: bool = True) -> Flask:
 
     @app.route('/api/today')
     def api_today():
-        df = log_parser.get_today_log(app.config['LOG_DIR'])
+        totals = today_totals()
         today_date = datetime.date.today()
 
-        if df is None or df.empty:
+        if totals is None:
             return jsonify({'has_data': False, 'date': today_date.isoformat()})
 
-        sessions = analytics.process_day(df, today_date)
-        daily_agg = analytics.aggregate_daily(sessions)
-
         stats = {}
         for act_type in ['deep_work', 'light_work', 'wasted']:
-            subset = daily_agg[daily_agg['Activity_Type'] == act_type]
-            stats[act_type] = round(
-                subset['DurationHours'].sum() if not subset.empty else 0, 2)
+            stats[act_type] = round(totals.get(act_type, 0), 2)
 
         return jsonify({
             'has_data': True,
@@ -149,11 +442,193 @@ def create_app(start_monitor: bool = True) -> Flask:
             'stats': stats,
         })
 
+    @app.route('/api/today/stream')
+    def api_today_stream():
+        """Server-sent events with what changed in today's sessions.
+
+        Each `update` event carries the updated totals and, per type, the
+        timeline points of sessions closed since the previous event plus the
+        open session (or null). Its id is the cursor to resume from, which
+        browsers send back as Last-Event-ID when they reconnect. A `reset`
+        event means the day's sessions were rebuilt (new day, rewritten log)
+        and the page should be reloaded.
+
+        A response ends after TODAY_STREAM_MAX seconds; EventSource then
+        reconnects (after the `retry` delay) and resumes from its last id, so
+        a request thread is only held for that long at a time.
+        """
+        raw_cursor = request.headers.get('Last-Event-ID') or \
+            _query_args(STREAM_PARAMS).get('cursor')
+        try:
+            cursor = json.loads(raw_cursor) if raw_cursor else None
+        except ValueError:
+            cursor = None
+        poll = app.config['TODAY_STREAM_POLL']
+        deadline = time.monotonic() + app.config['TODAY_STREAM_MAX']
+
+        def events():
+            nonlocal cursor
+            last_fingerprint = None
+            idle = 0.0
+            yield f'retry: {STREAM_RETRY_MS}\n\n'
+            while time.monotonic() < deadline:
+                fingerprint = today_fingerprint()
+                delta = None
+                if fingerprint != last_fingerprint:
+                    last_fingerprint = fingerprint
+                    delta = today_sessions.delta(cursor)
+
+                if delta is not None and delta.get('reset'):
+                    yield 'event: reset\ndata: {}\n\n'
+                    return
+                if delta is not None:
+                    cursor = delta['cursor']
+                    payload = {
+                        'totals': {t: round(h, 4) for t, h in delta['totals'].items()},
+                        'sessions': {
+                            t: {'closed': charts.timeline_points(closed),
+                                'open': (charts.timeline_points([delta['open'][t]])
+                                         if delta['open'][t] else None)}
+                            for t, closed in delta['closed'].items()
+                        },
+                    }
+                    yield (f"id: {json.dumps(cursor, separators=(',', ':'))}\n"
+                           f"event: update\ndata: {charts.dumps(payload)}\n\n")
+                    idle = 0.0
+                elif idle >= STREAM_KEEPALIVE_SECONDS:
+                    yield ': keepalive\n\n'
+                    idle = 0.0
+                time.sleep(poll)
+                idle += poll
+
+        response = Response(events(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @app.route('/api/range')
+    def api_range():
+        args = _query_args(API_RANGE_PARAMS)
+        date_range = api_date_range(args)
+        if date_range is None:
+            return api_error("start and end must be YYYY-MM-DD dates")
+        start_str, end_str, start_date, end_date = date_range
+        bucket = args.get('bucket', 'day')
+        if bucket != 'auto' and bucket not in analytics.BUCKETS:
+            return api_error(f"bucket must be one of auto, {', '.join(analytics.BUCKETS)}")
+        fields = api_fields(args, API_RANGE_FIELDS)
+        if fields is None:
+            return api_error(f"fields must be among {', '.join(API_RANGE_FIELDS)}")
+
+        file_dict = log_parser.get_raw_files(
+            app.config['LOG_DIR'], date_range=(start_date, end_date))
+        fingerprint = log_parser.files_fingerprint(file_dict)
+        if bucket == 'auto':
+            bucket = analytics.auto_bucket(min(file_dict), max(file_dict)) \
+                if file_dict else 'day'
+
+        def render():
+            agg = analytics.aggregate_buckets(
+                range_daily(file_dict, start_date, end_date, fingerprint), bucket)
+            return api_response({
+                'start': start_str, 'end': end_str, 'bucket': bucket,
+                'num_rows': len(agg), 'columns': _columnar(agg, fields),
+            })
+
+        etag = page_etag('api_range', start_str, end_str, bucket, fields, fingerprint)
+        return conditional_page(etag, render)
+
+    @app.route('/api/summary')
+    def api_summary():
+        args = _query_args(API_SUMMARY_PARAMS)
+        date_range = api_date_range(args)
+        if date_range is None:
+            return api_error("start and end must be YYYY-MM-DD dates")
+        start_str, end_str, start_date, end_date = date_range
+        fields = api_fields(args, API_SUMMARY_FIELDS)
+        if fields is None:
+            return api_error(f"fields must be among {', '.join(API_SUMMARY_FIELDS)}")
+
+        file_dict = log_parser.get_raw_files(
+            app.config['LOG_DIR'], date_range=(start_date, end_date))
+        fingerprint = log_parser.files_fingerprint(file_dict)
+
+        def render():
+            stats, num_days = range_summary(file_dict, start_date, end_date, fingerprint)
+            frame = pd.DataFrame({
+                'Activity_Type': list(stats),
+                'TotalHours': [s['total'] for s in stats.values()],
+                'AvgHoursPerDay': [s['avg'] for s in stats.values()],
+                'SessionCount': [s['sessions'] for s in stats.values()],
+            })
+            return api_response({
+                'start': start_str, 'end': end_str, 'num_days': num_days,
+                'columns': _columnar(frame, fields),
+            })
+
+        etag = page_etag('api_summary', start_str, end_str, fields, fingerprint)
+        return conditional_page(etag, render)
+
+    @app.route('/api/sessions')
+    def api_sessions():
+        args = _query_args(API_SESSION_PARAMS)
+        date_range = api_date_range(args)
+        if date_range is None:
+            return api_error("start and end must be YYYY-MM-DD dates")
+        start_str, end_str, start_date, end_date = date_range
+        fields = api_fields(args, API_SESSION_FIELDS)
+        if fields is None:
+            return api_error(f"fields must be among {', '.join(API_SESSION_FIELDS)}")
+
+        file_dict = log_parser.get_raw_files(
+            app.config['LOG_DIR'], date_range=(start_date, end_date))
+        fingerprint = log_parser.files_fingerprint(file_dict)
+
+        def render():
+            # Activity texts are the bulk of a session table; only join them if asked
+            sessions = range_sessions(file_dict, start_date, end_date, fingerprint) \
+                .to_frame(with_activity='Activity' in fields)
+            return api_response({
+                'start': start_str, 'end': end_str,
+                'num_rows': len(sessions), 'columns': _columnar(sessions, fields),
+            })
+
+        etag = page_etag('api_sessions', start_str, end_str, fields, fingerprint)
+        return conditional_page(etag, render)
+
+    @app.route('/api/memo')
+    def api_memo():
+        return jsonify(memo.stats())
+
+    # Only once every route is registered: the warmer renders pages right away
+    if start_threads:
+        start_background(app)
+
     return app
 
 
+def start_background(app: Flask):
+    """Start the snapshot writer, waste monitor and warmer registered by create_app."""
+    writer = app.extensions.get('snapshot_writer')
+    if writer is not None:
+        writer.start()
+        atexit.register(writer.stop)
+    monitor = app.extensions.get('waste_monitor')
+    if monitor is not None:
+        monitor.start()
+    start_warmer(app)
+
+
+def start_warmer(app: Flask):
+    """Start the precompute warmer, unless WARM_WINDOWS is empty."""
+    if app.config['WARM_WINDOWS']:
+        app.extensions['warmer'].start()
+
+
 def main():
     logging.basicConfig(level=logging.INFO)
+    # Exit normally on SIGTERM (launchd stop) so the final snapshot is written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app = create_app(start_monitor=True)
     app.run(host='127.0.0.1', port=5050, debug=False)
 
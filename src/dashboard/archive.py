@@ -0,0 +1,216 @@
+"""Memory-mapped columnar archive of finished days' raw logs.
+
+Layout of an archive directory:
+
+    timestamps.npy        int64   wall-clock seconds since the epoch, per row
+    labels.npy            int8    [z] label, per row
+    text_ids.npy          int32   index into strings.json, per row
+    day_ordinals.npy      int32   date.toordinal() of each archived day (sorted)
+    day_offsets.npy       int64   row offsets, len(days) + 1
+    day_fingerprints.npy  int64   (mtime_ns, size) of each day's source TSV
+    strings.json                  dictionary-encoded activity text table
+
+Numeric columns are opened with mmap_mode='r', so reading a day slices views
+out of the mapped files instead of opening and parsing its TSV. Today's log is
+never archived and keeps being read from its TSV.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import log_parser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.join(log_parser.DEFAULT_CACHE_DIR, 'archive')
+
+_ARCHIVE_FORMAT = 1
+_ARRAYS = ('timestamps', 'labels', 'text_ids',
+           'day_ordinals', 'day_offsets', 'day_fingerprints')
+
+
+class LogArchive:
+    """Read-only view of an archive directory built by build_archive."""
+
+    def __init__(self, archive_dir: str = DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self._meta_mtime_ns = None
+        self._arrays = {}
+        self._strings = np.array([], dtype=object)
+        self.refresh()
+
+    @property
+    def num_days(self) -> int:
+        if not self._arrays:
+            return 0
+        return len(self._arrays['day_ordinals'])
+
+    def refresh(self):
+        """Remap the archive if it was rebuilt since it was last opened."""
+        meta_path = os.path.join(self.archive_dir, 'meta.json')
+        try:
+            mtime_ns = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            self._meta_mtime_ns = None
+            self._arrays = {}
+            return
+        if mtime_ns == self._meta_mtime_ns:
+            return
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('format') != _ARCHIVE_FORMAT:
+            logger.warning("Ignoring archive with unknown format at %s",
+                           self.archive_dir)
+            self._arrays = {}
+            return
+
+        arrays = {
+            name: np.load(os.path.join(self.archive_dir, f'{name}.npy'),
+                          mmap_mode='r')
+            for name in _ARRAYS
+        }
+        with open(os.path.join(self.archive_dir, 'strings.json')) as f:
+            strings = np.array(json.load(f), dtype=object)
+        self._strings, self._arrays = strings, arrays
+        self._meta_mtime_ns = mtime_ns
+
+    def day_index(self, file_date: datetime.date) -> Optional[int]:
+        """Position of a day in the archive, or None if it isn't archived."""
+        if not self._arrays:
+            return None
+        ordinals = self._arrays['day_ordinals']
+        i = int(np.searchsorted(ordinals, file_date.toordinal()))
+        if i < len(ordinals) and ordinals[i] == file_date.toordinal():
+            return i
+        return None
+
+    def read_day(self, file_date: datetime.date,
+                 fingerprint: Optional[tuple] = None) -> Optional[pd.DataFrame]:
+        """Parsed-log frame for an archived day, shaped like read_raw_log's.
+
+        Returns None if the day isn't archived or, when a fingerprint is
+        given, if the source TSV changed after it was archived.
+        """
+        i = self.day_index(file_date)
+        if i is None:
+            return None
+        if fingerprint is not None and \
+                tuple(self._arrays['day_fingerprints'][i]) != tuple(fingerprint):
+            return None
+
+        lo, hi = self._arrays['day_offsets'][i:i + 2]
+        timestamps = self._arrays['timestamps'][lo:hi].astype('datetime64[s]')
+        iso = np.datetime_as_string(timestamps)
+        return pd.DataFrame({
+            'Date': [s[:10] for s in iso],
+            'Time': [s[11:] for s in iso],
+            'Activity': self._strings[self._arrays['text_ids'][lo:hi]],
+            'Label': self._arrays['labels'][lo:hi],
+            'Timestamp': timestamps.astype('datetime64[ns]'),
+        })
+
+    def reader(self, fallback: Callable[[str], pd.DataFrame]
+               ) -> Callable[[str], pd.DataFrame]:
+        """read_fn for process_range: archived days first, else `fallback`."""
+        self.refresh()
+
+        def read(path: str) -> pd.DataFrame:
+            file_date = log_parser.filepath_to_date(path)
+            df = self.read_day(file_date, log_parser.file_fingerprint(path))
+            if df is None:
+                return fallback(path)
+            return df
+
+        return read
+
+
+def build_archive(
+    log_dir: str = log_parser.DEFAULT_LOG_DIR,
+    archive_dir: str = DEFAULT_ARCHIVE_DIR,
+    until: Optional[datetime.date] = None,
+    read_fn: Callable[[str], pd.DataFrame] = log_parser.read_raw_log,
+) -> int:
+    """Compact every raw log dated before `until` (default: today) into an archive.
+
+    The archive is written next to `archive_dir` and swapped in with a rename,
+    so open readers keep their old mappings until they refresh. Returns the
+    number of archived days.
+    """
+    until = until or datetime.date.today()
+    file_dict = log_parser.get_raw_files(log_dir)
+    file_dict = {d: p for d, p in file_dict.items() if d < until}
+
+    ordinals, offsets, fingerprints = [], [0], []
+    frames = []
+    for file_date, path in file_dict.items():
+        fingerprint = log_parser.file_fingerprint(path)
+        df = read_fn(path)
+        ordinals.append(file_date.toordinal())
+        offsets.append(offsets[-1] + len(df))
+        fingerprints.append(fingerprint)
+        frames.append(df)
+
+    if frames:
+        rows = pd.concat(frames, ignore_index=True)
+    else:
+        rows = pd.DataFrame(columns=log_parser.RAW_COLUMNS)
+    text_ids, strings = pd.factorize(rows['Activity'].astype(str))
+
+    arrays = {
+        'timestamps': pd.to_datetime(rows['Timestamp']).to_numpy(
+            dtype='datetime64[s]').astype(np.int64),
+        'labels': rows['Label'].to_numpy(dtype=np.int8),
+        'text_ids': text_ids.astype(np.int32),
+        'day_ordinals': np.array(ordinals, dtype=np.int32),
+        'day_offsets': np.array(offsets, dtype=np.int64),
+        'day_fingerprints': np.array(fingerprints, dtype=np.int64).reshape(-1, 2),
+    }
+
+    tmp_dir = archive_dir + '.tmp'
+    old_dir = archive_dir + '.old'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), arr)
+    with open(os.path.join(tmp_dir, 'strings.json'), 'w') as f:
+        json.dump(list(strings), f)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'format': _ARCHIVE_FORMAT,
+                   'log_dir': os.path.abspath(log_dir),
+                   'until': until.isoformat()}, f)
+
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(archive_dir):
+        os.rename(archive_dir, old_dir)
+    os.rename(tmp_dir, archive_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info("Archived %d days (%d rows) to %s",
+                len(ordinals), len(rows), archive_dir)
+    return len(ordinals)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compact finished daily logs into a memory-mapped archive')
+    parser.add_argument('--log-dir', type=str, default=log_parser.DEFAULT_LOG_DIR,
+                        help='Directory containing raw YYYY-MM-DD_log.tsv files')
+    parser.add_argument('--archive-dir', type=str, default=DEFAULT_ARCHIVE_DIR,
+                        help='Directory to write the archive to')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    build_archive(args.log_dir, args.archive_dir)
+
+
+if __name__ == '__main__':
+    main()
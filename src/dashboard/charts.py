@@ -1,9 +1,27 @@
-"""Plotly figure builders for the dashboard."""
+"""Plotly figure builders for the dashboard.
 
+Each chart has two builders: `<chart>` returns full Plotly figure JSON, and
+`<chart>_data` returns a compact payload of just the plotted arrays, tagged
+with its chart `kind`. Compact payloads are turned into figures client-side
+by ProdCharts in static/prodcharts.js, which holds the static layouts.
+"""
+
+import datetime
+import json
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
 import pandas as pd
 import plotly
 import plotly.graph_objects as go
 
+from . import analytics
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the json module
+    orjson = None
+
 # Color scheme matching feature_extract.py
 COLORS = {
     'deep_work': '#1f77b4',    # blue
@@ -14,6 +32,9 @@ COLORS = {
 ORDERED_TYPES = ['deep_work', 'light_work', 'wasted']
 NICE_NAMES = {'deep_work': 'Deep Work', 'light_work': 'Light Work', 'wasted': 'Wasted'}
 
+# Characters of a session's activity text shown in timeline hovertext
+HOVER_CHARS = 50
+
 
 def _fig_to_json(fig: go.Figure) -> str:
     return plotly.io.to_json(fig)
@@ -47,6 +68,40 @@ def today_breakdown_bar(daily_agg: pd.DataFrame) -> str:
     return _fig_to_json(fig)
 
 
+def _timeline_traces(sessions: pd.DataFrame, y: pd.Series,
+                     showlegend: bool) -> List[go.Bar]:
+    """One horizontal go.Bar per activity type, one bar per session.
+
+    Bars start at the session's hour of day (`base`) on row `y`; sessions are
+    packed into array-valued traces so the figure size doesn't grow with the
+    number of traces.
+    """
+    start = sessions['StartTime'].dt
+    base = (start.hour + start.minute / 60).to_numpy()
+    hours = sessions['DurationHours'].to_numpy()
+    types = sessions['Activity_Type'].to_numpy()
+
+    traces = []
+    for act_type in ORDERED_TYPES:
+        mask = types == act_type
+        if not mask.any():
+            continue
+        hovertext = [f'{activity[:HOVER_CHARS]}<br>{h:.1f}h' for activity, h in
+                     zip(sessions['Activity'].to_numpy()[mask], hours[mask])]
+        traces.append(go.Bar(
+            x=hours[mask],
+            y=y.to_numpy()[mask],
+            base=base[mask],
+            orientation='h',
+            marker_color=COLORS.get(act_type, '#999'),
+            name=NICE_NAMES.get(act_type, act_type),
+            showlegend=showlegend,
+            hovertext=hovertext,
+            hoverinfo='text',
+        ))
+    return traces
+
+
 def today_timeline(sessions: pd.DataFrame) -> str:
     """Gantt-style timeline of today's sessions."""
     fig = go.Figure()
@@ -55,47 +110,65 @@ def today_timeline(sessions: pd.DataFrame) -> str:
         fig.update_layout(title='No sessions recorded today', height=300)
         return _fig_to_json(fig)
 
-    for act_type in ORDERED_TYPES:
-        subset = sessions[sessions['Activity_Type'] == act_type].copy()
-        if subset.empty:
-            continue
-
-        for _, row in subset.iterrows():
-            start = row['StartTime']
-            end = start + pd.Timedelta(hours=row['DurationHours'])
-            fig.add_trace(go.Bar(
-                x=[row['DurationHours']],
-                y=[NICE_NAMES.get(act_type, act_type)],
-                orientation='h',
-                base=[start.hour + start.minute / 60],
-                marker_color=COLORS.get(act_type, '#999'),
-                name=NICE_NAMES.get(act_type, act_type),
-                showlegend=False,
-                hovertext=f'{row["Activity"][:50]}<br>{row["DurationHours"]:.1f}h',
-                hoverinfo='text',
-            ))
+    rows = sessions['Activity_Type'].map(lambda t: NICE_NAMES.get(t, t))
+    fig.add_traces(_timeline_traces(sessions, rows, showlegend=False))
 
     fig.update_layout(
         title='Session Timeline',
         xaxis_title='Hour of Day',
         xaxis=dict(range=[6, 24], dtick=2),
-        barmode='stack',
+        barmode='overlay',
         height=250,
         margin=dict(l=100, r=20, t=40, b=30),
     )
     return _fig_to_json(fig)
 
 
-def range_stacked_bar(daily_agg: pd.DataFrame) -> str:
-    """Vertical stacked bars, x=date, y=hours, color=activity type."""
+def range_timeline(sessions: pd.DataFrame) -> str:
+    """Gantt-style timeline with one row per day, for multi-day ranges."""
+    fig = go.Figure()
+
+    if sessions.empty:
+        fig.update_layout(title='No sessions in selected range', height=300)
+        return _fig_to_json(fig)
+
+    rows = sessions['Date'].astype(str)
+    fig.add_traces(_timeline_traces(sessions, rows, showlegend=True))
+
+    num_days = rows.nunique()
+    fig.update_layout(
+        title='Session Timeline',
+        xaxis_title='Hour of Day',
+        xaxis=dict(range=[6, 24], dtick=2),
+        yaxis=dict(autorange='reversed', type='category'),
+        barmode='overlay',
+        height=max(250, 80 + 22 * num_days),
+        margin=dict(l=100, r=20, t=40, b=30),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02),
+    )
+    return _fig_to_json(fig)
+
+
+BUCKET_TITLES = {
+    'day': ('Daily Activity Breakdown', 'Date'),
+    'week': ('Weekly Activity Breakdown', 'Week of'),
+    'month': ('Monthly Activity Breakdown', 'Month'),
+}
+
+
+def range_stacked_bar(daily_agg: pd.DataFrame, bucket: str = 'day') -> str:
+    """Vertical stacked bars, x=date bucket, y=hours, color=activity type."""
     fig = go.Figure()
 
     if daily_agg.empty:
         fig.update_layout(title='No data for selected range', height=400)
         return _fig_to_json(fig)
 
+    title, xaxis_title = BUCKET_TITLES[bucket]
+    agg = analytics.aggregate_buckets(daily_agg, bucket)
+
     for act_type in ORDERED_TYPES:
-        subset = daily_agg[daily_agg['Activity_Type'] == act_type]
+        subset = agg[agg['Activity_Type'] == act_type]
         if subset.empty:
             continue
         fig.add_trace(go.Bar(
@@ -107,8 +180,8 @@ def range_stacked_bar(daily_agg: pd.DataFrame) -> str:
 
     fig.update_layout(
         barmode='stack',
-        title='Daily Activity Breakdown',
-        xaxis_title='Date',
+        title=title,
+        xaxis_title=xaxis_title,
         yaxis_title='Hours',
         height=450,
         margin=dict(l=60, r=20, t=40, b=80),
@@ -118,32 +191,52 @@ def range_stacked_bar(daily_agg: pd.DataFrame) -> str:
     return _fig_to_json(fig)
 
 
-def range_trend_lines(daily_agg: pd.DataFrame) -> str:
-    """7-day rolling average line chart per activity type."""
+WINDOW_TITLES = {
+    '7d': ('7-Day Rolling Average', '7d avg'),
+    '28d': ('28-Day Rolling Average', '28d avg'),
+    '90d': ('90-Day Rolling Average', '90d avg'),
+    'week': ('Week-to-Date Average', 'week avg'),
+    'month': ('Month-to-Date Average', 'month avg'),
+}
+
+
+def range_trend_lines(rolling: analytics.RollingEngine, window: str = '7d',
+                      bucket: str = 'day') -> str:
+    """Calendar-aware rolling average line chart per activity type.
+
+    For week/month buckets, each point is the average as of the bucket's
+    last day.
+    """
     fig = go.Figure()
 
-    if daily_agg.empty:
+    daily_hours = rolling.daily_hours()
+    if not daily_hours.any():
         fig.update_layout(title='No data for selected range', height=400)
         return _fig_to_json(fig)
 
+    title, suffix = WINDOW_TITLES[window]
+    ends = rolling.bucket_ends(bucket)
+    averages = rolling.rolling(window)[:, ends]
+    all_dates = rolling.dates()
+    dates = [all_dates[i].isoformat() for i in ends]
+
     for act_type in ORDERED_TYPES:
-        subset = daily_agg[daily_agg['Activity_Type'] == act_type].copy()
-        if subset.empty:
+        if act_type not in rolling.act_types:
+            continue
+        i = rolling.act_types.index(act_type)
+        if not daily_hours[i].any():
             continue
-
-        subset = subset.sort_values('Date')
-        subset['Rolling'] = subset['DurationHours'].rolling(7, min_periods=1).mean()
 
         fig.add_trace(go.Scatter(
-            x=subset['Date'].astype(str),
-            y=subset['Rolling'],
-            name=f'{NICE_NAMES.get(act_type, act_type)} (7d avg)',
+            x=dates,
+            y=averages[i],
+            name=f'{NICE_NAMES.get(act_type, act_type)} ({suffix})',
             line=dict(color=COLORS.get(act_type, '#999'), width=2),
             mode='lines',
         ))
 
     fig.update_layout(
-        title='7-Day Rolling Average',
+        title=title,
         xaxis_title='Date',
         yaxis_title='Hours',
         height=400,
@@ -179,3 +272,134 @@ def summary_pie(total_agg: pd.DataFrame) -> str:
         margin=dict(l=20, r=20, t=40, b=20),
     )
     return _fig_to_json(fig)
+
+
+# Decimal places kept for hours in compact payloads (0.36 s resolution)
+PAYLOAD_DECIMALS = 4
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(payload: Dict[str, Any]) -> str:
+    """Serialize a compact payload, encoding NumPy arrays natively if orjson is available."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(payload, default=_json_default, separators=(',', ':'))
+
+
+def _hours(values) -> np.ndarray:
+    return np.ascontiguousarray(
+        np.round(np.asarray(values, dtype=np.float64), PAYLOAD_DECIMALS))
+
+
+def today_breakdown_bar_data(daily_agg: pd.DataFrame) -> str:
+    """Compact today_breakdown_bar: today's hours per type."""
+    hours = daily_agg.groupby('Activity_Type')['DurationHours'].sum() \
+        if not daily_agg.empty else pd.Series(dtype=float)
+    return dumps({
+        'kind': 'today_breakdown_bar',
+        'types': ORDERED_TYPES,
+        'hours': _hours([hours.get(t, 0.0) for t in ORDERED_TYPES]),
+    })
+
+
+def _timeline_series(sessions: pd.DataFrame, with_rows: bool) -> List[Dict[str, Any]]:
+    start = sessions['StartTime'].dt
+    base = _hours(start.hour + start.minute / 60)
+    hours = _hours(sessions['DurationHours'])
+    types = sessions['Activity_Type'].to_numpy()
+    activities = sessions['Activity'].to_numpy()
+    rows = sessions['Date'].astype(str).to_numpy() if with_rows else None
+
+    series = []
+    for act_type in ORDERED_TYPES:
+        mask = types == act_type
+        if not mask.any():
+            continue
+        entry = {
+            'type': act_type,
+            'x': np.ascontiguousarray(hours[mask]),
+            'base': np.ascontiguousarray(base[mask]),
+            'text': [a[:HOVER_CHARS] for a in activities[mask]],
+        }
+        if with_rows:
+            entry['y'] = rows[mask].tolist()
+        series.append(entry)
+    return series
+
+
+def timeline_points(sessions: List[Tuple[datetime.datetime, float, str]]) -> Dict[str, Any]:
+    """Timeline bar arrays like _timeline_series' for (start, hours, activity) tuples."""
+    return {
+        'x': _hours([hours for _, hours, _ in sessions]),
+        'base': _hours([start.hour + start.minute / 60 for start, _, _ in sessions]),
+        'text': [activity[:HOVER_CHARS] for _, _, activity in sessions],
+    }
+
+
+def today_timeline_data(sessions: pd.DataFrame) -> str:
+    """Compact today_timeline: per-type session durations, start hours and texts."""
+    series = [] if sessions.empty else _timeline_series(sessions, with_rows=False)
+    return dumps({'kind': 'today_timeline', 'series': series})
+
+
+def range_timeline_data(sessions: pd.DataFrame) -> str:
+    """Compact range_timeline: like today_timeline_data plus each session's day."""
+    series = [] if sessions.empty else _timeline_series(sessions, with_rows=True)
+    num_days = 0 if sessions.empty else int(sessions['Date'].nunique())
+    return dumps({'kind': 'range_timeline', 'num_days': num_days, 'series': series})
+
+
+def range_stacked_bar_data(daily_agg: pd.DataFrame, bucket: str = 'day') -> str:
+    """Compact range_stacked_bar: bucket dates and per-type hours columns."""
+    payload = {'kind': 'range_stacked_bar', 'bucket': bucket, 'dates': [], 'series': []}
+    if daily_agg.empty:
+        return dumps(payload)
+
+    agg = analytics.aggregate_buckets(daily_agg, bucket)
+    table = agg.pivot_table(index='Date', columns='Activity_Type',
+                            values='DurationHours', aggfunc='sum', fill_value=0.0)
+    payload['dates'] = [d.isoformat() for d in table.index]
+    payload['series'] = [
+        {'type': act_type, 'hours': _hours(table[act_type])}
+        for act_type in ORDERED_TYPES if act_type in table.columns
+    ]
+    return dumps(payload)
+
+
+def range_trend_lines_data(rolling: analytics.RollingEngine, window: str = '7d',
+                           bucket: str = 'day') -> str:
+    """Compact range_trend_lines: bucket-end dates and per-type rolling averages."""
+    payload = {'kind': 'range_trend_lines', 'window': window, 'dates': [], 'series': []}
+    daily_hours = rolling.daily_hours()
+    if not daily_hours.any():
+        return dumps(payload)
+
+    ends = rolling.bucket_ends(bucket)
+    averages = rolling.rolling(window)[:, ends]
+    all_dates = rolling.dates()
+    payload['dates'] = [all_dates[i].isoformat() for i in ends]
+    for act_type in ORDERED_TYPES:
+        if act_type not in rolling.act_types:
+            continue
+        i = rolling.act_types.index(act_type)
+        if daily_hours[i].any():
+            payload['series'].append({'type': act_type, 'y': _hours(averages[i])})
+    return dumps(payload)
+
+
+def summary_pie_data(total_agg: pd.DataFrame) -> str:
+    """Compact summary_pie: total hours per type."""
+    if total_agg.empty:
+        return dumps({'kind': 'summary_pie', 'types': [], 'hours': []})
+    return dumps({
+        'kind': 'summary_pie',
+        'types': list(total_agg['Activity_Type']),
+        'hours': _hours(total_agg['TotalHours']),
+    })
@@ -1,18 +1,46 @@
 """Raw TSV log reading with inline [z] label extraction."""
 
+import bisect
+import collections
 import datetime
-import glob
+import hashlib
+import io
+import logging
 import os
-import re
-from typing import Dict, Optional, Tuple
+import pickle
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
 
 import pandas as pd
 
+# Pandas-free row parsing, re-exported for existing callers
+from .raw_log import LABEL_RE, LogRecord, iter_raw_log, parse_label
+
+logger = logging.getLogger(__name__)
+
 # Default path to raw log directory
 DEFAULT_LOG_DIR = 'INPUT_RAW_DIR/daily_logs'
 
-# Regex to match [z] prefix where z is an integer (possibly negative)
-_LABEL_RE = re.compile(r'^\[(-?\d+)\]\s*(.*)')
+# Default location of the on-disk parsed-day cache
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'productivitylog')
+DEFAULT_CACHE_ENTRIES = 512
+
+# Bumped whenever the layout of parsed frames changes, invalidating old entries
+_CACHE_FORMAT = 3
+
+
+# Format of the Date + Time columns joined by a space
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns of a parsed raw log
+RAW_COLUMNS = ['Date', 'Time', 'Activity', 'Label', 'Timestamp']
+
+# Activity is always read as text, so a numeric-only entry parses the same
+# whether it's read with the whole file or in an appended chunk
+_READ_DTYPES = {'Activity': str}
 
 
 def filepath_to_date(path: str) -> datetime.date:
@@ -22,60 +50,393 @@ def filepath_to_date(path: str) -> datetime.date:
     return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
 
 
-def parse_label(activity: str) -> Tuple[int, str]:
-    """Extract [z] prefix from activity string.
-
-    Returns (label, cleaned_text). Defaults to (0, raw_text) if no label found
-    (pre-label era logs).
-    """
-    if not isinstance(activity, str):
-        return (0, str(activity))
-    m = _LABEL_RE.match(activity)
-    if m:
-        return (int(m.group(1)), m.group(2))
-    return (0, activity)
+def read_raw_log(path: str) -> pd.DataFrame:
+    """Read a raw TSV log file and add Label and Timestamp columns inline."""
+    df = pd.read_csv(path, delimiter='\t', dtype=_READ_DTYPES)
+    return _add_labels(df)
 
 
-def read_raw_log(path: str) -> pd.DataFrame:
-    """Read a raw TSV log file and add Label column inline."""
-    df = pd.read_csv(path, delimiter='\t')
+def _add_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized parse_label over the Activity column, plus a Timestamp column."""
     if 'Activity' not in df.columns:
-        return pd.DataFrame(columns=['Date', 'Time', 'Activity', 'Label'])
+        return pd.DataFrame(columns=RAW_COLUMNS)
+
+    # Non-string cells (empty, numeric) fall back to their str() form,
+    # matching parse_label
+    text = df['Activity'].fillna('nan').astype(str)
+    parts = text.str.extract(LABEL_RE)
+    has_label = parts[0].notna()
 
-    labels_and_text = df['Activity'].apply(parse_label)
-    df['Label'] = labels_and_text.apply(lambda x: x[0])
-    df['Activity'] = labels_and_text.apply(lambda x: x[1])
+    df['Label'] = parts[0].where(has_label, '0').astype('int64')
+    df['Activity'] = parts[1].where(has_label, text)
+    df['Timestamp'] = pd.to_datetime(
+        df['Date'].astype(str) + ' ' + df['Time'].astype(str),
+        format=TIMESTAMP_FORMAT)
     return df
 
 
+class TailLogReader:
+    """Follows a growing raw log, parsing only lines appended since last read.
+
+    The byte offset of the last complete line is remembered between calls.
+    The file is reread from scratch if it was replaced, truncated, or its
+    already-consumed bytes changed; `version` is bumped whenever that happens
+    so consumers holding derived state know to rebuild it.
+    """
+
+    # Bytes before the offset compared on each read to detect in-place rewrites
+    _GUARD_BYTES = 64
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = 0
+        self._offset = 0
+        self._inode = None
+        self._guard = b''
+        self._columns = None
+        self._df = None
+        self._lock = threading.Lock()
+
+    def read(self) -> pd.DataFrame:
+        """Return all rows parsed so far, reading any newly appended lines."""
+        with self._lock:
+            st = os.stat(self.path)
+            with open(self.path, 'rb') as f:
+                if self._needs_reset(f, st):
+                    self._reset(f)
+                elif st.st_size > self._offset:
+                    self._append(f)
+            return self._df
+
+    def state(self) -> Optional[Dict]:
+        """Picklable read position and rows, or None before the first read."""
+        with self._lock:
+            if self._df is None:
+                return None
+            return {'path': self.path, 'offset': self._offset, 'inode': self._inode,
+                    'guard': self._guard, 'columns': self._columns, 'df': self._df}
+
+    def restore(self, state: Dict):
+        """Resume from state(); the next read() revalidates it like any other."""
+        if state.get('path') != self.path:
+            return
+        with self._lock:
+            self._offset = state['offset']
+            self._inode = state['inode']
+            self._guard = state['guard']
+            self._columns = state['columns']
+            self._df = state['df']
+            self.version += 1
+
+    def _needs_reset(self, f, st: os.stat_result) -> bool:
+        if self._df is None or st.st_ino != self._inode:
+            return True
+        if st.st_size < self._offset:
+            return True
+        f.seek(self._offset - len(self._guard))
+        return f.read(len(self._guard)) != self._guard
+
+    def _reset(self, f):
+        st = os.fstat(f.fileno())
+        f.seek(0)
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end:
+            df = pd.read_csv(io.BytesIO(data[:end]), delimiter='\t',
+                             dtype=_READ_DTYPES)
+            self._columns = list(df.columns)
+        else:
+            df = pd.DataFrame()
+            self._columns = None
+        self._df = _add_labels(df)
+        self._inode = st.st_ino
+        self._set_offset(data, end)
+        self.version += 1
+
+    def _append(self, f):
+        f.seek(self._offset)
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        if self._columns is None:
+            # Only a partial header had been written; start over
+            self._reset(f)
+            return
+        chunk = pd.read_csv(io.BytesIO(data[:end]), delimiter='\t',
+                            header=None, names=self._columns, dtype=_READ_DTYPES)
+        chunk = _add_labels(chunk)
+        self._df = pd.concat([self._df, chunk], ignore_index=True)
+        self._set_offset(data, end, base=self._offset)
+
+    def _set_offset(self, data: bytes, end: int, base: int = 0):
+        self._offset = base + end
+        previous = self._guard if base else b''
+        tail = data[max(0, end - self._GUARD_BYTES):end]
+        self._guard = (previous + tail)[-self._GUARD_BYTES:]
+
+
+def file_fingerprint(path: str) -> Tuple[int, int]:
+    """(mtime_ns, size) of a file, used to detect changed logs."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def files_fingerprint(file_dict: Dict[datetime.date, str]) -> str:
+    """Digest of the paths and (mtime_ns, size) of a set of raw logs.
+
+    Changes whenever a log in the set is edited, appended to, added or
+    removed, so it can key anything derived from those logs.
+    """
+    h = hashlib.sha1()
+    for file_date, path in sorted(file_dict.items()):
+        try:
+            mtime_ns, size = file_fingerprint(path)
+        except FileNotFoundError:
+            mtime_ns, size = -1, -1
+        h.update(f'{file_date}\t{path}\t{mtime_ns}\t{size}\n'.encode())
+    return h.hexdigest()
+
+
+class ParsedDayCache:
+    """Parsed raw logs cached in memory (LRU) and on disk (one pickle per day).
+
+    Entries are invalidated when the source file's mtime or size changes, so
+    past days are parsed once and then served from memory or a single binary
+    read. Returned frames are shared between callers and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        max_entries: int = DEFAULT_CACHE_ENTRIES,
+        read_fn: Callable[[str], pd.DataFrame] = read_raw_log,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.read_fn = read_fn
+        self._mem = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def read(self, path: str) -> pd.DataFrame:
+        """Drop-in replacement for read_raw_log that consults the cache."""
+        key = os.path.abspath(path)
+        fingerprint = file_fingerprint(path)
+
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._mem.move_to_end(key)
+                return entry[1]
+
+        df = self._load(path, fingerprint)
+        if df is None:
+            df = self.read_fn(path)
+            self._store(path, fingerprint, df)
+
+        with self._lock:
+            self._mem[key] = (fingerprint, df)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+        return df
+
+    def clear(self):
+        """Drop in-memory entries (the on-disk cache is left in place)."""
+        with self._lock:
+            self._mem.clear()
+
+    def _disk_path(self, path: str) -> str:
+        return os.path.join(self.cache_dir, os.path.basename(path) + '.pkl')
+
+    def _load(self, path: str, fingerprint: Tuple[int, int]) -> Optional[pd.DataFrame]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(path), 'rb') as f:
+                blob = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Discarding unreadable cache entry for %s", path)
+            return None
+        if blob.get('format') != _CACHE_FORMAT:
+            return None
+        if blob.get('source') != os.path.abspath(path):
+            return None
+        if tuple(blob.get('fingerprint', ())) != fingerprint:
+            return None
+        return blob['df']
+
+    def _store(self, path: str, fingerprint: Tuple[int, int], df: pd.DataFrame):
+        if not self.cache_dir:
+            return
+        blob = {
+            'format': _CACHE_FORMAT,
+            'source': os.path.abspath(path),
+            'fingerprint': fingerprint,
+            'df': df,
+        }
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(blob, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(path))
+        except OSError:
+            logger.exception("Failed to write cache entry for %s", path)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class LogDirIndex:
+    """Sorted date -> path index of the raw logs in a directory.
+
+    Built once with os.scandir and rescanned only when the directory's mtime
+    changes (i.e. a file was added, removed or renamed). Date-range lookups
+    bisect over the sorted dates.
+    """
+
+    # Directory mtimes this recent may hide a same-tick change; rescan next time
+    _SETTLE_SECONDS = 2.0
+
+    def __init__(self, log_dir: str = DEFAULT_LOG_DIR):
+        self.log_dir = log_dir
+        self._mtime_ns = None
+        self._dates = []
+        self._paths = []
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rescan the directory if it changed since the last scan."""
+        try:
+            mtime_ns = os.stat(self.log_dir).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+
+        with self._lock:
+            if mtime_ns is not None and mtime_ns == self._mtime_ns:
+                return
+            self._scan(mtime_ns)
+
+    def lookup(
+        self,
+        date_range: Optional[Tuple[datetime.date, datetime.date]] = None,
+    ) -> Dict[datetime.date, str]:
+        """Sorted dict mapping date -> file path, optionally within a range."""
+        self.refresh()
+        with self._lock:
+            if date_range is None:
+                lo, hi = 0, len(self._dates)
+            else:
+                lo = bisect.bisect_left(self._dates, date_range[0])
+                hi = bisect.bisect_right(self._dates, date_range[1])
+            return dict(zip(self._dates[lo:hi], self._paths[lo:hi]))
+
+    def state(self) -> Dict:
+        with self._lock:
+            return {'log_dir': self.log_dir, 'mtime_ns': self._mtime_ns,
+                    'dates': list(self._dates), 'paths': list(self._paths)}
+
+    def restore(self, state: Dict):
+        """Adopt a previous scan; refresh() rescans if the directory changed since."""
+        if state.get('log_dir') != self.log_dir:
+            return
+        with self._lock:
+            self._mtime_ns = state['mtime_ns']
+            self._dates = list(state['dates'])
+            self._paths = list(state['paths'])
+
+    def _scan(self, mtime_ns: Optional[int]):
+        file_dict = {}
+        try:
+            entries = sorted(os.scandir(self.log_dir), key=lambda e: e.name)
+        except FileNotFoundError:
+            entries = []
+
+        for entry in entries:
+            # Same matching rules as glob('*_log.tsv')
+            if entry.name.startswith('.') or not entry.name.endswith('_log.tsv'):
+                continue
+            try:
+                file_date = filepath_to_date(entry.name)
+            except (ValueError, IndexError):
+                continue
+            # Prefer the canonical YYYY-MM-DD_log.tsv when several files share a date
+            if file_date in file_dict and entry.name != f'{file_date}_log.tsv':
+                continue
+            file_dict[file_date] = os.path.join(self.log_dir, entry.name)
+
+        self._dates = sorted(file_dict)
+        self._paths = [file_dict[d] for d in self._dates]
+        if mtime_ns is not None and time.time() - mtime_ns / 1e9 < self._SETTLE_SECONDS:
+            mtime_ns = None
+        self._mtime_ns = mtime_ns
+
+
+_dir_indexes: Dict[str, LogDirIndex] = {}
+_dir_indexes_lock = threading.Lock()
+
+
+def get_dir_index(log_dir: str = DEFAULT_LOG_DIR) -> LogDirIndex:
+    """Shared LogDirIndex for a log directory."""
+    with _dir_indexes_lock:
+        index = _dir_indexes.get(log_dir)
+        if index is None:
+            index = LogDirIndex(log_dir)
+            _dir_indexes[log_dir] = index
+    return index
+
+
 def get_raw_files(
     log_dir: str = DEFAULT_LOG_DIR,
     date_range: Optional[Tuple[datetime.date, datetime.date]] = None,
 ) -> Dict[datetime.date, str]:
-    """Glob raw log files and filter by date range.
+    """Look up raw log files, optionally filtered by date range.
 
     Returns sorted dict mapping date -> file path.
     """
-    all_paths = glob.glob(os.path.join(log_dir, '*_log.tsv'))
-    file_dict = {}
+    return get_dir_index(log_dir).lookup(date_range)
 
-    for path in all_paths:
-        try:
-            file_date = filepath_to_date(path)
-        except (ValueError, IndexError):
-            continue
-        if date_range and not (date_range[0] <= file_date <= date_range[1]):
-            continue
-        file_dict[file_date] = path
 
-    return dict(sorted(file_dict.items()))
+# One tail reader per log directory, following that directory's current day
+_today_readers: Dict[str, TailLogReader] = {}
+_today_readers_lock = threading.Lock()
 
 
-def get_today_log(log_dir: str = DEFAULT_LOG_DIR) -> Optional[pd.DataFrame]:
-    """Read today's log file, or return None if it doesn't exist."""
+def today_log_path(log_dir: str = DEFAULT_LOG_DIR) -> str:
+    """Path of today's log file (which may not exist yet)."""
     today = datetime.date.today()
     filename = f"{today.strftime('%Y-%m-%d')}_log.tsv"
-    path = os.path.join(log_dir, filename)
-    if os.path.exists(path):
-        return read_raw_log(path)
-    return None
+    return os.path.join(log_dir, filename)
+
+
+def get_today_reader(log_dir: str = DEFAULT_LOG_DIR) -> Optional[TailLogReader]:
+    """Tail reader for today's log file, or None if it doesn't exist yet."""
+    path = today_log_path(log_dir)
+    if not os.path.exists(path):
+        return None
+
+    with _today_readers_lock:
+        reader = _today_readers.get(log_dir)
+        if reader is None or reader.path != path:
+            reader = TailLogReader(path)
+            _today_readers[log_dir] = reader
+    return reader
+
+
+def get_today_log(log_dir: str = DEFAULT_LOG_DIR) -> Optional[pd.DataFrame]:
+    """Read today's log file, or return None if it doesn't exist.
+
+    Only lines appended since the previous call are parsed. The returned frame
+    is shared with later callers and must not be mutated.
+    """
+    reader = get_today_reader(log_dir)
+    if reader is None:
+        return None
+    try:
+        return reader.read()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,136 @@
+"""Request-independent memo of derived results, shared by routes and threads.
+
+Keys are tuples that end in a fingerprint of the source logs (see
+log_parser.files_fingerprint), e.g. ('sessions', start, end, fingerprint),
+so an entry is never stale: once a log changes its old entries simply stop
+being asked for and age out of the LRU. The memo is bounded both by entry
+count and by the approximate bytes of the values it holds.
+"""
+
+import collections
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MEMO_ENTRIES = 512
+DEFAULT_MEMO_BYTES = 256 * 1024 * 1024
+
+
+def sizeof(value: Any) -> int:
+    """Approximate memory held by a memoized value, in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+class Memo:
+    """Thread-safe LRU of computed values, bounded by entries and bytes.
+
+    Values are shared between callers and must not be mutated. Hit, miss
+    and eviction counts are kept for tuning the bounds (see stats()).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_ENTRIES,
+                 max_bytes: int = DEFAULT_MEMO_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, size)
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._hits = collections.Counter()
+        self._misses = collections.Counter()
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Memoized value for `key`, calling `compute` to produce it on a miss.
+
+        Counters are kept per kind, the first element of the key.
+        """
+        kind = key[0] if isinstance(key, tuple) and key else key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits[kind] += 1
+                return entry[0]
+            self._misses[kind] += 1
+
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        size = sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                # Larger than the whole memo; hand it back without keeping it
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry/byte usage and hit/miss counts, overall and per kind."""
+        with self._lock:
+            kinds = sorted(set(self._hits) | set(self._misses), key=str)
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': sum(self._hits.values()),
+                'misses': sum(self._misses.values()),
+                'evictions': self._evictions,
+                'kinds': {str(k): {'hits': self._hits[k], 'misses': self._misses[k]}
+                          for k in kinds},
+            }
+
+    def state(self, skip_kinds: Iterable = (), max_bytes: Optional[int] = None) -> list:
+        """Entries as (key, value), least recent first, e.g. for a snapshot.
+
+        Entries of `skip_kinds` are left out, as are the least recent ones
+        beyond `max_bytes` in total.
+        """
+        skip_kinds = set(skip_kinds)
+        entries, total = [], 0
+        with self._lock:
+            for key, (value, size) in reversed(self._entries.items()):
+                kind = key[0] if isinstance(key, tuple) and key else key
+                if kind in skip_kinds:
+                    continue
+                if max_bytes is not None and total + size > max_bytes:
+                    break
+                entries.append((key, value))
+                total += size
+        entries.reverse()
+        return entries
+
+    def restore(self, entries: list):
+        for key, value in entries:
+            self.put(key, value)
@@ -4,6 +4,7 @@ import datetime
 import logging
 import subprocess
 import threading
+from typing import Callable, Dict, Optional
 
 from . import log_parser, analytics
 
@@ -21,10 +22,15 @@ class WasteMonitor:
         threshold_hours: float = DEFAULT_THRESHOLD_HOURS,
         poll_interval: int = DEFAULT_POLL_INTERVAL,
         log_dir: str = log_parser.DEFAULT_LOG_DIR,
+        today_sessions: Optional[analytics.TodaySessions] = None,
+        totals_fn: Optional[Callable[[], Optional[Dict[str, float]]]] = None,
     ):
         self.threshold_hours = threshold_hours
         self.poll_interval = poll_interval
         self.log_dir = log_dir
+        self.today_sessions = today_sessions or analytics.TodaySessions(log_dir)
+        # Source of today's per-type hours, e.g. the app's memoized totals
+        self.totals_fn = totals_fn or self.today_sessions.totals
         self._stop_event = threading.Event()
         self._notified_today: datetime.date | None = None
         self._thread: threading.Thread | None = None
@@ -63,13 +69,10 @@ class WasteMonitor:
         if self._notified_today == today:
             return
 
-        df = log_parser.get_today_log(self.log_dir)
-        if df is None or df.empty:
+        totals = self.totals_fn()
+        if totals is None:
             return
-
-        sessions = analytics.process_day(df, today)
-        wasted = sessions[sessions['Activity_Type'] == 'wasted']
-        total_wasted = wasted['DurationHours'].sum() if not wasted.empty else 0
+        total_wasted = totals.get('wasted', 0)
 
         if total_wasted >= self.threshold_hours:
             self._notify(total_wasted)
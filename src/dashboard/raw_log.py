@@ -0,0 +1,59 @@
+"""Pandas-free parsing of raw TSV log rows.
+
+Kept free of pandas (and of the rest of the dashboard) so tooling that only
+needs to read or label log rows starts without importing it; log_parser
+re-exports everything here.
+"""
+
+import csv
+import datetime
+import re
+from typing import Iterator, NamedTuple, Tuple
+
+# Regex to match [z] prefix where z is an integer (possibly negative)
+LABEL_RE = re.compile(r'^\[(-?\d+)\]\s*(.*)')
+
+
+def parse_label(activity: str) -> Tuple[int, str]:
+    """Extract [z] prefix from activity string.
+
+    Returns (label, cleaned_text). Defaults to (0, raw_text) if no label found
+    (pre-label era logs).
+    """
+    if not isinstance(activity, str):
+        return (0, str(activity))
+    m = LABEL_RE.match(activity)
+    if m:
+        return (int(m.group(1)), m.group(2))
+    return (0, activity)
+
+
+class LogRecord(NamedTuple):
+    """One parsed raw log row."""
+    timestamp: datetime.datetime
+    label: int
+    text: str
+
+
+def iter_raw_log(path: str) -> Iterator[LogRecord]:
+    """Stream a raw TSV log as LogRecords using only the csv module.
+
+    A lightweight alternative to log_parser.read_raw_log for small files on hot paths
+    that don't need a DataFrame.
+    """
+    with open(path, newline='') as f:
+        reader = csv.reader(f, delimiter='\t')
+        header = next(reader, None)
+        if not header or 'Activity' not in header:
+            return
+        date_i = header.index('Date')
+        time_i = header.index('Time')
+        activity_i = header.index('Activity')
+
+        for row in reader:
+            if not row:
+                continue
+            label, text = parse_label(row[activity_i])
+            timestamp = datetime.datetime.fromisoformat(
+                f'{row[date_i]} {row[time_i]}')
+            yield LogRecord(timestamp, label, text)
@@ -0,0 +1,153 @@
+"""Production entry point: the dashboard under gunicorn with pre-forked workers.
+
+The app is created once in the gunicorn master (preload_app), so the snapshot
+(directory index, today's sessions, memo) is loaded before fork
+and shared copy-on-write by every worker; the daily rollup and parsed-day
+pickles are shared on disk. Workers use threads (gthread); an open /today
+tab holds one of a worker's threads for up to TODAY_STREAM_MAX seconds at a
+time (its /api/today/stream response), then frees it and reconnects, so size
+--threads above the number of tabs expected to be open at once.
+
+The master also renders the WARM_WINDOWS pages once before forking, so
+workers start with those pages memoized. Memos are per process, so every
+worker then runs its own precompute warmer.
+
+The waste monitor and snapshot writer must run in exactly one process. The
+first worker to take an exclusive lock on CACHE_DIR/background.lock starts
+them; the lock is released when that worker exits, and the worker gunicorn
+spawns to replace it takes over.
+
+Requires the optional gunicorn dependency: uv pip install -e '.[serve]'
+"""
+
+import argparse
+import fcntl
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+
+from .app import create_app, start_background, start_warmer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BIND = '127.0.0.1:5050'
+DEFAULT_WORKERS = 4
+DEFAULT_THREADS = 8
+
+# Held for the life of the worker that runs the background threads
+_background_lock = None
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # optional dependency
+    BaseApplication = None
+
+
+def claim_background(app: Flask) -> bool:
+    """Take the background lock without blocking; True if this process won it."""
+    global _background_lock
+    lock_path = os.path.join(app.config['CACHE_DIR'], 'background.lock')
+    os.makedirs(app.config['CACHE_DIR'], exist_ok=True)
+    f = open(lock_path, 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _background_lock = f
+    return True
+
+
+def preload_app(warm_windows: Optional[List[str]] = None,
+                config: Optional[Dict[str, Any]] = None) -> Flask:
+    """Create the app in the master and warm its pages before fork.
+
+    `warm_windows` are extra page URLs to keep warm besides the defaults;
+    `config` overrides app settings (see create_app).
+    """
+    app = create_app(start_threads=False, config=config)
+    app.config['WARM_WINDOWS'].extend(warm_windows or [])
+    if app.config['WARM_WINDOWS']:
+        app.extensions['warmer'].warm_if_changed()
+    return app
+
+
+def gunicorn_options(bind: str = DEFAULT_BIND, workers: int = DEFAULT_WORKERS,
+                     threads: int = DEFAULT_THREADS) -> Dict[str, Any]:
+    """Gunicorn settings for the dashboard, including its fork hooks."""
+
+    def post_fork(server, worker):
+        app = server.app.wsgi()
+        if claim_background(app):
+            logger.info("Worker %d runs the background threads", worker.pid)
+            start_background(app)
+        else:
+            start_warmer(app)
+
+    return {
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        # A stream response holds its thread for up to TODAY_STREAM_MAX seconds;
+        # don't treat that as a hang
+        'timeout': 120,
+        'post_fork': post_fork,
+    }
+
+
+def run(bind: str = DEFAULT_BIND, workers: int = DEFAULT_WORKERS,
+        threads: int = DEFAULT_THREADS, warm_windows: Optional[List[str]] = None,
+        config: Optional[Dict[str, Any]] = None):
+    """Serve the dashboard under gunicorn until interrupted."""
+    if BaseApplication is None:
+        raise SystemExit("gunicorn is not installed; run: uv pip install -e '.[serve]'")
+
+    class DashboardApplication(BaseApplication):
+        def __init__(self, options: Dict[str, Any]):
+            self.options = options
+            self.application: Optional[Flask] = None
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Flask:
+            if self.application is None:
+                self.application = preload_app(warm_windows, config)
+            return self.application
+
+    DashboardApplication(gunicorn_options(bind, workers, threads)).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve the productivity dashboard with pre-forked workers')
+    parser.add_argument('--bind', type=str, default=DEFAULT_BIND,
+                        help='Address to listen on (host:port)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Number of worker processes')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help='Request threads per worker')
+    parser.add_argument('--warm', action='append', default=[], metavar='URL',
+                        help='Extra page to keep precomputed, e.g. '
+                             "'/range?window=28d&bucket=week' (repeatable)")
+    parser.add_argument('--process-workers', type=int, default=None,
+                        help='Processes for multi-day computations in each worker '
+                             '(default: PROCESS_WORKERS, 0 = in-line)')
+    args = parser.parse_args()
+
+    config = {}
+    if args.process_workers is not None:
+        config['PROCESS_WORKERS'] = args.process_workers
+
+    logging.basicConfig(level=logging.INFO)
+    run(args.bind, args.workers, args.threads, args.warm, config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Warm-start snapshots of the dashboard's in-memory derived state.
+
+A snapshot bundles the log directory index, today's tail reader and session
+builder, and the small entries of the app's memo (see memo.py: rollup rows,
+summaries and chart payloads, up to SNAPSHOT_MEMO_BYTES) into one pickle, so
+a restarted app answers its first requests from memory instead of rescanning
+and recomputing. Everything in it is revalidated against file fingerprints on
+use, so a stale snapshot only costs the work it would have saved. The daily
+rollup and parsed days persist themselves (see analytics.DailyRollup and
+log_parser.ParsedDayCache) and aren't duplicated here.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from flask import Flask
+
+from . import log_parser
+
+logger = logging.getLogger(__name__)
+
+# Seconds between periodic snapshots
+DEFAULT_SNAPSHOT_INTERVAL = 300
+# Most recent memo entries kept in a snapshot, by approximate size
+DEFAULT_SNAPSHOT_MEMO_BYTES = 16 * 1024 * 1024
+
+# Memo kinds not worth pickling: whole session tables, and today's values,
+# which are cheap to recompute from the restored session builder
+_SKIPPED_MEMO_KINDS = ('sessions', 'today_view', 'today_totals')
+
+_SNAPSHOT_FORMAT = 4
+
+
+def save_snapshot(app: Flask, path: str):
+    """Write the app's derived state to `path` (atomically)."""
+    log_dir = app.config['LOG_DIR']
+    reader = log_parser.get_today_reader(log_dir)
+    blob = {
+        'format': _SNAPSHOT_FORMAT,
+        'log_dir': os.path.abspath(log_dir),
+        'saved_at': time.time(),
+        'dir_index': log_parser.get_dir_index(log_dir).state(),
+        'today_reader': reader.state() if reader else None,
+        'today_sessions': app.extensions['today_sessions'].state(),
+        'memo': app.extensions['memo'].state(
+            skip_kinds=_SKIPPED_MEMO_KINDS,
+            max_bytes=app.config['SNAPSHOT_MEMO_BYTES']),
+    }
+
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(blob, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.exception("Failed to write snapshot to %s", path)
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_snapshot(app: Flask, path: str) -> bool:
+    """Restore state saved by save_snapshot; returns whether one was loaded."""
+    try:
+        with open(path, 'rb') as f:
+            blob = pickle.load(f)
+    except FileNotFoundError:
+        return False
+    except Exception:
+        logger.warning("Discarding unreadable snapshot at %s", path)
+        return False
+
+    log_dir = app.config['LOG_DIR']
+    if blob.get('format') != _SNAPSHOT_FORMAT:
+        return False
+    if blob.get('log_dir') != os.path.abspath(log_dir):
+        return False
+
+    log_parser.get_dir_index(log_dir).restore(blob['dir_index'])
+    reader = log_parser.get_today_reader(log_dir)
+    if reader is not None and blob['today_reader']:
+        reader.restore(blob['today_reader'])
+    app.extensions['today_sessions'].restore(blob['today_sessions'])
+    app.extensions['memo'].restore(blob['memo'])
+    logger.info("Restored snapshot from %s (saved %.0fs ago)",
+                path, time.time() - blob['saved_at'])
+    return True
+
+
+class SnapshotWriter:
+    """Saves a snapshot every `interval` seconds, and once more on stop()."""
+
+    def __init__(self, app: Flask, path: str,
+                 interval: int = DEFAULT_SNAPSHOT_INTERVAL):
+        self.app = app
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start periodic saving as a daemon thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info("Snapshot writer started (path=%s, interval=%ds)",
+                    self.path, self.interval)
+
+    def stop(self):
+        """Stop the thread and write a final snapshot."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.save()
+
+    def save(self):
+        try:
+            save_snapshot(self.app, self.path)
+        except Exception:
+            logger.exception("Error saving snapshot")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.save()
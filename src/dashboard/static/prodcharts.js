@@ -0,0 +1,221 @@
+// Builds Plotly figures from the compact payloads of charts.*_data; full
+// figure JSON (payloads with a layout) is plotted as-is.
+var ProdCharts = (function () {
+    var COLORS = {deep_work: '#1f77b4', light_work: '#2ca02c', wasted: '#d62728'};
+    var NAMES = {deep_work: 'Deep Work', light_work: 'Light Work', wasted: 'Wasted'};
+    var WINDOW_TITLES = {
+        '7d': ['7-Day Rolling Average', '7d avg'],
+        '28d': ['28-Day Rolling Average', '28d avg'],
+        '90d': ['90-Day Rolling Average', '90d avg'],
+        'week': ['Week-to-Date Average', 'week avg'],
+        'month': ['Month-to-Date Average', 'month avg']
+    };
+    var BUCKET_TITLES = {
+        day: ['Daily Activity Breakdown', 'Date'],
+        week: ['Weekly Activity Breakdown', 'Week of'],
+        month: ['Monthly Activity Breakdown', 'Month']
+    };
+    var AXIS = {gridcolor: 'white', linecolor: 'white', zerolinecolor: 'white',
+                zerolinewidth: 2, ticks: '', automargin: true};
+    var LEGEND = {orientation: 'h', yanchor: 'bottom', y: 1.02};
+
+    function name(t) { return NAMES[t] || t; }
+    function color(t) { return COLORS[t] || '#999'; }
+    function axis(extra) { return Object.assign({}, AXIS, extra); }
+    function layout(title, extra) {
+        return Object.assign({
+            title: {text: title, x: 0.05},
+            font: {color: '#2a3f5f'},
+            paper_bgcolor: 'white',
+            plot_bgcolor: '#E5ECF6',
+            hovermode: 'closest',
+            xaxis: axis({}),
+            yaxis: axis({})
+        }, extra);
+    }
+    function empty(title, height) { return {data: [], layout: layout(title, {height: height})}; }
+
+    function hovertext(p) {
+        return p.text.map(function (t, i) { return t + '<br>' + p.x[i].toFixed(1) + 'h'; });
+    }
+    function typeRows(t, p) { return p.x.map(function () { return name(t); }); }
+
+    function timelineTraces(series, rows, showlegend) {
+        return series.map(function (s) {
+            return {
+                type: 'bar', orientation: 'h', x: s.x, base: s.base,
+                y: rows ? s.y : typeRows(s.type, s),
+                name: name(s.type), marker: {color: color(s.type)}, showlegend: showlegend,
+                hovertext: hovertext(s), hoverinfo: 'text'
+            };
+        });
+    }
+
+    var builders = {
+        today_breakdown_bar: function (p) {
+            return {
+                data: p.types.map(function (t, i) {
+                    return {type: 'bar', y: ['Today'], x: [p.hours[i]], name: name(t),
+                            orientation: 'h', marker: {color: color(t)},
+                            text: p.hours[i].toFixed(1) + 'h', textposition: 'inside'};
+                }),
+                layout: layout('Hours by Activity Type', {
+                    barmode: 'stack', height: 200, legend: LEGEND,
+                    xaxis: axis({title: {text: 'Hours'}}),
+                    margin: {l: 60, r: 20, t: 40, b: 30}
+                })
+            };
+        },
+        today_timeline: function (p) {
+            if (!p.series.length) return empty('No sessions recorded today', 300);
+            return {
+                data: timelineTraces(p.series, false, false),
+                layout: layout('Session Timeline', {
+                    barmode: 'overlay', height: 250,
+                    xaxis: axis({title: {text: 'Hour of Day'}, range: [6, 24], dtick: 2}),
+                    margin: {l: 100, r: 20, t: 40, b: 30}
+                })
+            };
+        },
+        range_timeline: function (p) {
+            if (!p.series.length) return empty('No sessions in selected range', 300);
+            return {
+                data: timelineTraces(p.series, true, true),
+                layout: layout('Session Timeline', {
+                    barmode: 'overlay', height: Math.max(250, 80 + 22 * p.num_days),
+                    legend: LEGEND,
+                    xaxis: axis({title: {text: 'Hour of Day'}, range: [6, 24], dtick: 2}),
+                    yaxis: axis({autorange: 'reversed', type: 'category'}),
+                    margin: {l: 100, r: 20, t: 40, b: 30}
+                })
+            };
+        },
+        range_stacked_bar: function (p) {
+            if (!p.dates.length) return empty('No data for selected range', 400);
+            var titles = BUCKET_TITLES[p.bucket];
+            return {
+                data: p.series.map(function (s) {
+                    return {type: 'bar', x: p.dates, y: s.hours, name: name(s.type),
+                            marker: {color: color(s.type)}};
+                }),
+                layout: layout(titles[0], {
+                    barmode: 'stack', height: 450, legend: LEGEND,
+                    xaxis: axis({title: {text: titles[1]}, tickangle: -45}),
+                    yaxis: axis({title: {text: 'Hours'}}),
+                    margin: {l: 60, r: 20, t: 40, b: 80}
+                })
+            };
+        },
+        range_trend_lines: function (p) {
+            if (!p.dates.length) return empty('No data for selected range', 400);
+            var titles = WINDOW_TITLES[p.window];
+            return {
+                data: p.series.map(function (s) {
+                    return {type: 'scatter', mode: 'lines', x: p.dates, y: s.y,
+                            name: name(s.type) + ' (' + titles[1] + ')',
+                            line: {color: color(s.type), width: 2}};
+                }),
+                layout: layout(titles[0], {
+                    height: 400, legend: LEGEND,
+                    xaxis: axis({title: {text: 'Date'}, tickangle: -45}),
+                    yaxis: axis({title: {text: 'Hours'}}),
+                    margin: {l: 60, r: 20, t: 40, b: 80}
+                })
+            };
+        },
+        summary_pie: function (p) {
+            if (!p.types.length) return empty('No data', 400);
+            return {
+                data: [{type: 'pie', labels: p.types.map(name), values: p.hours,
+                        marker: {colors: p.types.map(color)}, textinfo: 'label+percent',
+                        hovertemplate: '%{label}: %{value:.1f} hours<extra></extra>'}],
+                layout: layout('Activity Distribution', {
+                    height: 400, margin: {l: 20, r: 20, t: 40, b: 20}
+                })
+            };
+        }
+    };
+
+    function render(id, payload) {
+        if (!payload) return;
+        var fig = payload.layout ? payload : builders[payload.kind](payload);
+        Plotly.newPlot(id, fig.data, fig.layout, {responsive: true});
+    }
+
+    function traceIndex(gd, t) {
+        for (var i = 0; i < gd.data.length; i++) {
+            if (gd.data[i].name === name(t)) return i;
+        }
+        return -1;
+    }
+    function toArray(values) { return Array.prototype.slice.call(values); }
+
+    // Applies one /api/today/stream update to the today page. `open` records
+    // which types' timeline traces end in a still-open session.
+    function patchToday(barId, timelineId, update, open) {
+        var bar = document.getElementById(barId);
+        var timeline = document.getElementById(timelineId);
+        Object.keys(update.totals).forEach(function (t) {
+            var hours = update.totals[t];
+            var card = document.getElementById('stat-' + t);
+            if (card) card.textContent = hours.toFixed(1) + 'h';
+            var i = traceIndex(bar, t);
+            if (i >= 0) Plotly.restyle(bar, {x: [[hours]], text: [hours.toFixed(1) + 'h']}, [i]);
+        });
+
+        Object.keys(update.sessions).forEach(function (t) {
+            var change = update.sessions[t];
+            var added = change.closed;
+            if (change.open) {
+                added = {x: added.x.concat(change.open.x), base: added.base.concat(change.open.base),
+                         text: added.text.concat(change.open.text)};
+            }
+            if (!added.x.length && !open[t]) return;
+
+            var i = traceIndex(timeline, t);
+            if (i < 0) {
+                if (!added.x.length) return;
+                if (!timeline.data.length) { window.location.reload(); return; }
+                Plotly.addTraces(timeline, timelineTraces([Object.assign({type: t}, added)], false, false));
+            } else if (!open[t]) {
+                // Only new bars: append them
+                Plotly.extendTraces(timeline, {x: [added.x], base: [added.base],
+                                               y: [typeRows(t, added)], hovertext: [hovertext(added)]}, [i]);
+            } else {
+                // The last bar was the open session; replace it with the new bars
+                var trace = timeline.data[i];
+                var n = trace.x.length - 1;
+                Plotly.restyle(timeline, {
+                    x: [toArray(trace.x).slice(0, n).concat(added.x)],
+                    base: [toArray(trace.base).slice(0, n).concat(added.base)],
+                    y: [toArray(trace.y).slice(0, n).concat(typeRows(t, added))],
+                    hovertext: [toArray(trace.hovertext).slice(0, n).concat(hovertext(added))]
+                }, [i]);
+            }
+            open[t] = !!change.open;
+        });
+    }
+
+    // Keeps the today page live: follows /api/today/stream from the cursor the
+    // page was rendered at and patches its charts in place.
+    function followToday(barId, timelineId, cursor) {
+        if (!window.EventSource) return;
+        var open = {};
+        var url = '/api/today/stream';
+        if (cursor) {
+            cursor.open.forEach(function (t) { open[t] = true; });
+            url += '?cursor=' + encodeURIComponent(JSON.stringify(
+                {epoch: cursor.epoch, closed: cursor.closed}));
+        }
+        var source = new EventSource(url);
+        source.addEventListener('update', function (e) {
+            patchToday(barId, timelineId, JSON.parse(e.data), open);
+        });
+        source.addEventListener('reset', function () {
+            source.close();
+            window.location.reload();
+        });
+    }
+
+    return {render: render, builders: builders, followToday: followToday};
+})();
@@ -0,0 +1,135 @@
+"""Background precompute of the dashboard's common pages.
+
+The warmer renders a configurable list of page URLs (app.config['WARM_WINDOWS'],
+e.g. '/range?window=28d&bucket=week' for a bookmarked view) through the app
+itself, so their sessions, aggregates and chart payloads are in the memo (see
+memo.py) before anyone asks. Windows are re-rendered at startup, when the date
+changes (relative defaults such as "past 18 days" move at midnight) and
+whenever a log file changes. Unchanged windows are memo hits, so a re-warm
+only pays for what changed.
+"""
+
+import datetime
+import logging
+import threading
+import time
+import urllib.parse
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from flask import Flask
+
+from . import analytics, log_parser
+
+logger = logging.getLogger(__name__)
+
+# The default /today, /range and /summary pages
+DEFAULT_WARM_WINDOWS = ['/today', '/range', '/summary']
+DEFAULT_WARM_POLL = 30  # seconds between checks for changed logs
+
+
+def window_problems(url: str, page_params: Dict[str, FrozenSet[str]]) -> List[str]:
+    """Why a WARM_WINDOWS url won't warm the page it names, if it won't.
+
+    `page_params` maps each warmable page to the query parameters it reads
+    (app.PAGE_PARAMS). Pages fall back to defaults for parameters they don't
+    recognise, so such a url would quietly warm a different view than intended.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.path not in page_params:
+        return [f"unknown page {parts.path}"]
+    problems = []
+    for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True):
+        if name not in page_params[parts.path]:
+            problems.append(f"unknown parameter {name}")
+        elif name == 'window' and value not in analytics.ROLLING_WINDOWS:
+            problems.append(f"window must be one of {', '.join(analytics.ROLLING_WINDOWS)}")
+        elif name == 'bucket' and value != 'auto' and value not in analytics.BUCKETS:
+            problems.append(f"bucket must be one of auto, {', '.join(analytics.BUCKETS)}")
+        elif name in ('start', 'end'):
+            try:
+                datetime.date.fromisoformat(value)
+            except ValueError:
+                problems.append(f"{name} must be a YYYY-MM-DD date")
+    return problems
+
+
+class PrecomputeWarmer:
+    """Re-renders the app's WARM_WINDOWS whenever the logs or the date change."""
+
+    def __init__(self, app: Flask, page_params: Dict[str, FrozenSet[str]],
+                 poll_interval: int = DEFAULT_WARM_POLL):
+        self.app = app
+        # Warmable pages and the query parameters each reads (app.PAGE_PARAMS)
+        self.page_params = page_params
+        self.poll_interval = poll_interval
+        # (date, fingerprint of every log) as of the last warm
+        self._signature: Optional[Tuple[datetime.date, str]] = None
+        # Windows already checked with window_problems()
+        self._checked = set()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the warmer as a daemon thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info("Precompute warmer started (%d windows, interval=%ds)",
+                    len(self.app.config['WARM_WINDOWS']), self.poll_interval)
+
+    def stop(self):
+        """Signal the warmer to stop."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def signature(self) -> Tuple[datetime.date, str]:
+        log_dir = self.app.config['LOG_DIR']
+        return datetime.date.today(), log_parser.files_fingerprint(
+            log_parser.get_raw_files(log_dir))
+
+    def warm_if_changed(self) -> bool:
+        """Warm every window if the date or any log changed; True if it did."""
+        signature = self.signature()
+        if signature == self._signature:
+            return False
+        # A failed window is retried on the next poll rather than left cold
+        # until the logs change again
+        if self.warm():
+            self._signature = signature
+        return True
+
+    def warm(self) -> bool:
+        """Render every configured window once; False if any of them failed."""
+        t0 = time.perf_counter()
+        client = self.app.test_client()
+        ok = True
+        for url in self.app.config['WARM_WINDOWS']:
+            if self._stop_event.is_set():
+                return False
+            if url not in self._checked:
+                self._checked.add(url)
+                for problem in window_problems(url, self.page_params):
+                    logger.warning("Warm window %s: %s", url, problem)
+            if urllib.parse.urlsplit(url).path not in self.page_params:
+                # e.g. /api/today/stream, which would never finish rendering
+                continue
+            try:
+                response = client.get(url)
+                response.close()
+                if response.status_code >= 400:
+                    logger.warning("Warming %s returned HTTP %d", url, response.status_code)
+                    ok = False
+            except Exception:
+                logger.exception("Error warming %s", url)
+                ok = False
+        logger.debug("Warmed %d windows in %.2fs",
+                     len(self.app.config['WARM_WINDOWS']), time.perf_counter() - t0)
+        return ok
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.warm_if_changed()
+            except Exception:
+                logger.exception("Error in precompute warmer")
+            self._stop_event.wait(self.poll_interval)